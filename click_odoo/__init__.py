@@ -1,7 +1,26 @@
 # Copyright 2018 ACSONE SA/NV (<http://acsone.eu>)
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
 
-from .compat import odoo  # noqa
+import sys
+
+from .checkpoint import Checkpoint  # noqa
 from .compat import odoo_bin  # noqa
-from .env import OdooEnvironment  # noqa
+from .env import LazyEnvironment, OdooEnvironment  # noqa
 from .env_options import env_options  # noqa
+from .parallel import run_sharded  # noqa
+from .records import iter_pages, iter_records  # noqa
+from .retry import run_with_retry  # noqa
+
+
+def __getattr__(name):
+    # odoo is imported lazily, so commands start fast when they don't need it
+    if name == "odoo":
+        from . import compat
+
+        return compat.odoo
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+if sys.version_info < (3, 7):
+    # no module __getattr__ support
+    from .compat import odoo  # noqa
@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Bulk loading of CSV files, through a staging table."""
+
+import collections
+import csv
+import logging
+import time
+
+import click
+
+from .compat import flush_all, invalidate_all
+from .env_options import env_options
+
+_logger = logging.getLogger(__name__)
+
+MODES = ("orm", "sql")
+STAGING_TABLE = "click_odoo_staging"
+
+
+class BulkLoadResult(
+    collections.namedtuple(
+        "BulkLoadResult", ["created", "updated", "rejected", "elapsed"]
+    )
+):
+    @property
+    def rows_per_second(self):
+        if not self.elapsed:
+            return 0
+        return (self.created + self.updated) / self.elapsed
+
+
+_TRUE = ("1", "t", "true", "y", "yes")
+
+
+def _columns(model, header, key):
+    fields = []
+    for name in header:
+        field = model._fields.get(name)
+        if field is None:
+            raise ValueError("{} has no field {}.".format(model._name, name))
+        if not field.store or not field.column_type:
+            raise ValueError(
+                "Field {} of {} is not stored in a column of {}.".format(
+                    name, model._name, model._table
+                )
+            )
+        fields.append(field)
+    if key and key not in header:
+        raise ValueError("The key {} is not a column of the file.".format(key))
+    return fields
+
+
+def _key_match(field, table):
+    """SQL join of the staging table ``s`` with the records with the same key."""
+    value = 's."{}"'.format(field.name)
+    if field.type in ("integer", "many2one") or field.name == "id":
+        # invalid values match no record, instead of failing
+        value = "CASE WHEN {0} ~ '^\\s*-?\\d+\\s*$' THEN {0}::int4 END".format(value)
+        condition = 't."{}" = {}'.format(field.name, value)
+    elif field.type in ("char", "text", "selection") and not field.translate:
+        condition = 't."{}" = {}'.format(field.name, value)
+    else:
+        # no index can be used
+        condition = 't."{}"::text = {}'.format(field.name, value)
+    return (
+        'LEFT JOIN LATERAL (SELECT t.id FROM "{}" t WHERE {} '
+        "ORDER BY t.id LIMIT 1) t ON true".format(table, condition)
+    )
+
+
+def _to_python(field, value):
+    if value is None or value == "":
+        return False
+    if field.type in ("integer", "many2one"):
+        return int(value)
+    if field.type in ("float", "monetary"):
+        return float(value)
+    if field.type == "boolean":
+        return value.lower() in _TRUE
+    return value
+
+
+def _sql_value(field):
+    """SQL expression of the value of ``field`` in the staging table ``s``."""
+    from .compat import odoo_version_info
+
+    value = "NULLIF(s.\"{}\", '')".format(field.name)
+    if field.translate and odoo_version_info >= (16, 0):
+        return "jsonb_build_object('en_US', {})".format(value)
+    return "{}::{}".format(value, field.column_type[1])
+
+
+def _add_to_compute(env, field, records):
+    from .compat import odoo_version_info
+
+    if odoo_version_info >= (13, 0):
+        env.add_to_compute(field, records)
+    else:
+        env.add_todo(field, records)
+
+
+def _recompute(records, fnames, created):
+    """Recompute the stored fields that depend on fields updated in SQL."""
+    from .compat import odoo_version_info
+
+    invalidate_all(records.env)
+    if created:
+        for field in records._fields.values():
+            if field.compute and field.store:
+                _add_to_compute(records.env, field, records)
+    records.modified(fnames)
+    if odoo_version_info >= (13, 0):
+        # flushing recomputes
+        flush_all(records.env)
+    else:
+        records.recompute()
+
+
+class _Loader:
+    def __init__(self, env, model, fields, key, mode):
+        self.env = env
+        self.model = env[model]
+        self.fields = fields
+        self.key = key
+        self.mode = mode
+        self.created = 0
+        self.updated = 0
+        self.rejected = []
+
+    def rows(self, batch_size):
+        """Yield batches of (row number, target id, values) tuples.
+
+        The target id is the id of the existing record with the same key.
+        """
+        cr = self.env.cr
+        columns = ", ".join('s."{}"'.format(f.name) for f in self.fields)
+        if self.key:
+            match = _key_match(self.model._fields[self.key], self.model._table)
+        else:
+            match = "LEFT JOIN (SELECT NULL::integer AS id) t ON false"
+        last_row = 0
+        while True:
+            cr.execute(
+                "SELECT s._row, t.id, {} FROM {} s {} WHERE s._row > %s "
+                "ORDER BY s._row LIMIT %s".format(columns, STAGING_TABLE, match),
+                (last_row, batch_size),
+            )
+            rows = cr.fetchall()
+            if not rows:
+                return
+            yield rows
+            last_row = rows[-1][0]
+
+    def load(self, rows):
+        creates = [row for row in rows if not row[1]]
+        updates = [row for row in rows if row[1]]
+        if self.key == "id" and creates:
+            ids = [
+                row[2 + self.fields.index(self.model._fields["id"])] for row in creates
+            ]
+            raise ValueError("no record with id {}".format(", ".join(map(str, ids))))
+        if self.mode == "orm":
+            self._load_orm(creates, updates)
+        else:
+            self._load_sql(creates, updates)
+        return len(creates), len(updates)
+
+    def _vals(self, row):
+        return {
+            field.name: _to_python(field, value)
+            for field, value in zip(self.fields, row[2:])
+            if field.name != "id"
+        }
+
+    def _load_orm(self, creates, updates):
+        from .compat import odoo_version_info
+
+        if creates:
+            vals_list = [self._vals(row) for row in creates]
+            if odoo_version_info >= (12, 0):
+                self.model.create(vals_list)
+            else:
+                for vals in vals_list:
+                    self.model.create(vals)
+        for row in updates:
+            self.model.browse(row[1]).write(self._vals(row))
+        flush_all(self.env)
+
+    def _load_sql(self, creates, updates):
+        cr = self.env.cr
+        fields = [f for f in self.fields if f.name != "id"]
+        fnames = [f.name for f in fields]
+        table = self.model._table
+        if creates:
+            cr.execute(
+                'INSERT INTO "{}" ({}, create_uid, create_date, write_uid, write_date) '
+                "SELECT {}, %(uid)s, now() at time zone 'UTC', "
+                "%(uid)s, now() at time zone 'UTC' "
+                "FROM {} s WHERE s._row = ANY(%(rows)s) ORDER BY s._row "
+                "RETURNING id".format(
+                    table,
+                    ", ".join('"{}"'.format(n) for n in fnames),
+                    ", ".join(_sql_value(f) for f in fields),
+                    STAGING_TABLE,
+                ),
+                {"uid": self.env.uid, "rows": [row[0] for row in creates]},
+            )
+            ids = [r[0] for r in cr.fetchall()]
+            _recompute(self.model.browse(ids), fnames, created=True)
+        if updates:
+            assignments = []
+            for field in fields:
+                value = _sql_value(field)
+                if value.startswith("jsonb_build_object"):
+                    # keep the other translations
+                    value = "COALESCE(t.\"{}\", '{{}}'::jsonb) || {}".format(
+                        field.name, value
+                    )
+                assignments.append('"{}" = {}'.format(field.name, value))
+            cr.execute(
+                'UPDATE "{}" t SET {}, write_uid = %(uid)s, '
+                "write_date = now() at time zone 'UTC' "
+                "FROM {} s JOIN unnest(%(rows)s, %(ids)s) AS m(row, id) "
+                "ON m.row = s._row WHERE t.id = m.id".format(
+                    table, ", ".join(assignments), STAGING_TABLE
+                ),
+                {
+                    "uid": self.env.uid,
+                    "rows": [row[0] for row in updates],
+                    "ids": [row[1] for row in updates],
+                },
+            )
+            _recompute(self.model.browse([row[1] for row in updates]), fnames, False)
+
+    def load_batch(self, rows):
+        """Load rows in a savepoint, or one by one if that fails."""
+        try:
+            with self.env.cr.savepoint():
+                created, updated = self.load(rows)
+            self.created += created
+            self.updated += updated
+        except Exception as e:
+            invalidate_all(self.env)
+            if len(rows) == 1:
+                self.rejected.append((rows[0][0], str(e).strip()))
+            else:
+                for row in rows:
+                    self.load_batch([row])
+        invalidate_all(self.env)
+
+
+def bulk_load(env, model, file, key=None, mode="orm", batch_size=1000):
+    """Create or update records of ``model`` from the CSV text stream ``file``.
+
+    The first line of the file contains field names, of fields stored in the
+    table of the model (many2one values are ids). The file is copied with
+    ``COPY`` into a temporary staging table. Rows are then loaded by batches
+    of ``batch_size``: rows with the same ``key`` as an existing record
+    update it, the others create records. ``key="id"`` only updates records.
+
+    In ``orm`` mode, records are created and updated with the ORM. In ``sql``
+    mode, they are inserted and updated with set based SQL queries, and the
+    stored computed fields that depend on the loaded fields are recomputed;
+    defaults, constraints implemented in python and overrides of ``create``
+    and ``write`` are then bypassed.
+
+    Each batch is loaded in a savepoint. When a batch fails, its rows are
+    loaded one by one, and the rows that fail are rejected. Nothing is
+    committed, so the load is undone if the transaction is rolled back.
+
+    Return a ``BulkLoadResult``, with the number of created and updated
+    records, the list of ``(row number, error)`` of rejected rows, and the
+    elapsed time.
+    """
+    if mode not in MODES:
+        raise ValueError("Unsupported bulk load mode {}.".format(mode))
+    start = time.perf_counter()
+    header = next(csv.reader([file.readline()]))
+    fields = _columns(env[model], header, key)
+    cr = env.cr
+    flush_all(env)
+    # qualified, so a permanent table of the same name is never dropped
+    cr.execute("DROP TABLE IF EXISTS pg_temp.{}".format(STAGING_TABLE))
+    cr.execute(
+        "CREATE TEMPORARY TABLE {} (_row serial PRIMARY KEY, {}) ON COMMIT DROP".format(
+            STAGING_TABLE, ", ".join('"{}" text'.format(n) for n in header)
+        )
+    )
+    cr._obj.copy_expert(
+        "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+            STAGING_TABLE, ", ".join('"{}"'.format(n) for n in header)
+        ),
+        file,
+    )
+    loader = _Loader(env, model, fields, key, mode)
+    for rows in loader.rows(batch_size):
+        loader.load_batch(rows)
+    cr.execute("DROP TABLE pg_temp.{}".format(STAGING_TABLE))
+    invalidate_all(env)
+    result = BulkLoadResult(
+        loader.created, loader.updated, loader.rejected, time.perf_counter() - start
+    )
+    _logger.info(
+        "%s: %s created, %s updated, %s rejected in %.1fs (%.0f rows/s).",
+        model,
+        result.created,
+        result.updated,
+        len(result.rejected),
+        result.elapsed,
+        result.rows_per_second,
+    )
+    return result
+
+
+@click.command(
+    help="Create or update records of MODEL from a CSV FILE, whose first "
+    "line contains field names. The file is copied to a staging table, and "
+    "loaded by batches. Rejected rows are reported on stderr."
+)
+@env_options(with_addons_path=True)
+@click.option("--model", "-m", required=True, help="Model to load.")
+@click.option(
+    "--key",
+    help="Field identifying the records to update. Rows with no matching "
+    "record create one.",
+)
+@click.option(
+    "--mode",
+    type=click.Choice(MODES),
+    default="orm",
+    show_default=True,
+    help="Load records with the ORM, or with set based SQL queries.",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Number of rows per batch.",
+)
+@click.argument("file", type=click.File("r"))
+def main(env, model, key, mode, batch_size, file):
+    result = bulk_load(env, model, file, key=key, mode=mode, batch_size=batch_size)
+    # rejected rows do not fail the command, so the other rows are committed
+    for row, error in result.rejected:
+        click.echo("row {}: {}".format(row, error), err=True)
+    click.echo(
+        "{} created, {} updated, {} rejected in {:.1f}s ({:.0f} rows/s).".format(
+            result.created,
+            result.updated,
+            len(result.rejected),
+            result.elapsed,
+            result.rows_per_second,
+        ),
+        err=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
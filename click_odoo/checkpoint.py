@@ -0,0 +1,118 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+import json
+import os
+import sys
+
+TABLE = "click_odoo_checkpoint"
+
+
+def _main_script():
+    # scripts run by click-odoo are the __main__ module while they run
+    main = sys.modules.get("__main__")
+    return getattr(main, "__file__", None) or sys.argv[0]
+
+
+class Checkpoint:
+    """Watermark of a batch job, to resume it where it stopped.
+
+    The checkpoint is identified by the ``script`` path (default: the running
+    script), the database of ``env`` and ``job``. It is stored in the
+    ``click_odoo_checkpoint`` table of the database, or in the json file at
+    ``path`` when provided.
+
+    ``commit(watermark)`` commits the transaction of ``env``. When stored in
+    the database, the watermark is committed in the same transaction as the
+    work done, so they are always consistent. When stored in a file, it is
+    written after the commit, so the work done since the previous checkpoint
+    is done again if the process dies in between.
+    """
+
+    def __init__(self, env, job="default", script=None, path=None):
+        self.env = env
+        self.job = job
+        self.script = os.path.abspath(script or _main_script())
+        self.database = env.cr.dbname
+        self.path = path
+        if not path:
+            self._create_table()
+        self.watermark = self._load()
+
+    def _create_table(self):
+        self.env.cr.execute(
+            "CREATE TABLE IF NOT EXISTS {} ("
+            " script VARCHAR NOT NULL,"
+            " job VARCHAR NOT NULL,"
+            " watermark TEXT NOT NULL,"
+            " write_date TIMESTAMP NOT NULL DEFAULT (now() at time zone 'UTC'),"
+            " PRIMARY KEY (script, job)"
+            ")".format(TABLE)
+        )
+
+    def _read_file(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def _write_file(self, state):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        if self.path:
+            state = self._read_file()
+            return state.get(self.database, {}).get(self.script, {}).get(self.job)
+        self.env.cr.execute(
+            "SELECT watermark FROM {} WHERE script = %s AND job = %s".format(TABLE),
+            (self.script, self.job),
+        )
+        row = self.env.cr.fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _save(self, watermark):
+        if self.path:
+            state = self._read_file()
+            jobs = state.setdefault(self.database, {}).setdefault(self.script, {})
+            if watermark is None:
+                jobs.pop(self.job, None)
+            else:
+                jobs[self.job] = watermark
+            self._write_file(state)
+            return
+        cr = self.env.cr
+        if watermark is None:
+            cr.execute(
+                "DELETE FROM {} WHERE script = %s AND job = %s".format(TABLE),
+                (self.script, self.job),
+            )
+            return
+        cr.execute(
+            "UPDATE {} SET watermark = %s, write_date = now() at time zone 'UTC' "
+            "WHERE script = %s AND job = %s".format(TABLE),
+            (json.dumps(watermark), self.script, self.job),
+        )
+        if not cr.rowcount:
+            cr.execute(
+                "INSERT INTO {} (script, job, watermark) VALUES (%s, %s, %s)".format(
+                    TABLE
+                ),
+                (self.script, self.job, json.dumps(watermark)),
+            )
+
+    def commit(self, watermark):
+        """Commit the work done up to ``watermark``, a json serializable value."""
+        if self.path:
+            self.env.cr.commit()
+            self._save(watermark)
+        else:
+            self._save(watermark)
+            self.env.cr.commit()
+        self.watermark = watermark
+
+    def done(self):
+        """Commit and remove the checkpoint, so the next run starts over."""
+        self.commit(None)
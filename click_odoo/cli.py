@@ -8,12 +8,34 @@ import sys
 
 import click
 
-from . import console
+from . import console, jsonl
+from .env import LazyEnvironment
 from .env_options import env_options
 
 _logger = logging.getLogger(__name__)
 
 
+class _cli_env_options(env_options):
+    def _use_lazy_env(self, ctx, options):
+        if options["lazy_env"] is None and _is_interactive(ctx.params):
+            # the console starts while the registry loads
+            return True
+        return super()._use_lazy_env(ctx, options)
+
+    def _invoke_databases(self, ctx, databases, options):
+        if len(databases) > 1 and _is_interactive(ctx.params):
+            raise click.UsageError(
+                "The interactive console cannot run on several databases."
+            )
+        return super()._invoke_databases(ctx, databases, options)
+
+
+def _is_interactive(params):
+    return (not params.get("script") or params.get("interactive")) and (
+        console._isatty(sys.stdin)
+    )
+
+
 @click.command(
     help="Execute a python script in an initialized Odoo "
     "environment. The script has access to a 'env' global "
@@ -23,7 +45,21 @@ _logger = logging.getLogger(__name__)
     "interactive console is started if stdin appears "
     "to be a terminal."
 )
-@env_options(database_required=False, with_addons_path=True)
+@_cli_env_options(
+    database_required=False,
+    with_addons_path=True,
+    with_multi_database=True,
+    with_timings=True,
+    with_profile=True,
+    with_sql_stats=True,
+    with_memory_limits=True,
+    with_lazy_env=True,
+    with_retries=True,
+    with_readonly=True,
+    with_timeouts=True,
+    with_lock_watch=True,
+    with_every=True,
+)
 @click.option(
     "--interactive/--no-interactive",
     "-i",
@@ -35,26 +71,92 @@ _logger = logging.getLogger(__name__)
     "values are ipython, ptpython, bpython, python. If not "
     "provided they are tried in this order.",
 )
+@click.option(
+    "--jsonl",
+    "jsonl_mode",
+    is_flag=True,
+    help="Read stdin as JSON lines, and pass them by batches to the "
+    "handle(env, records) function of the script. Each batch is committed "
+    "separately. The values returned by handle are written to stdout "
+    "as JSON lines.",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help="Number of JSON lines per batch, with --jsonl.",
+)
 @click.argument("script", required=False, type=click.Path(exists=True, dir_okay=False))
 @click.argument("script-args", nargs=-1)
-def main(env, interactive, shell_interface, script, script_args):
+def main(
+    env, interactive, shell_interface, jsonl_mode, batch_size, script, script_args
+):
+    ctx = click.get_current_context()
+    if jsonl_mode and (not script or interactive or not env):
+        raise click.UsageError(
+            "--jsonl requires a database and a script, and is not interactive."
+        )
+    if jsonl_mode and ctx.meta.get("click_odoo.retries"):
+        # batches are committed as stdin is read, so it cannot run again
+        raise click.UsageError("--retries cannot be used with --jsonl.")
+    if ctx.meta.get("click_odoo.every") and (jsonl_mode or _is_interactive(ctx.params)):
+        raise click.UsageError("--every cannot be used interactively or with --jsonl.")
     global_vars = {"env": env}
     if script:
         sys.argv[1:] = script_args
         global_vars = runpy.run_path(
             script, init_globals=global_vars, run_name="__main__"
         )
+    if jsonl_mode:
+        _run_jsonl(env, global_vars, batch_size)
+        return
     if not script or interactive:
         if console._isatty(sys.stdin):
             if not env:
                 _logger.info("No environment set, use `-d dbname` to get one.")
-            console.Shell.interact(global_vars, shell_interface)
-            if env:
+            elif isinstance(env, LazyEnvironment):
+                env.prewarm()
+            sql_monitor = None
+            if env and ctx.meta.get("click_odoo.sql_stats"):
+                sql_monitor = global_vars["sqltrace"] = console.SqlMonitor(env)
+            try:
+                console.Shell.interact(global_vars, shell_interface)
+            finally:
+                if sql_monitor:
+                    sql_monitor.close()
+            if env and getattr(env, "materialized", True):
                 env.cr.rollback()
         else:
             sys.argv[:] = [""]
             global_vars["__name__"] = "__main__"
-            exec(sys.stdin.read(), global_vars)
+            # kept, to run it again when retrying or repeating
+            if "click_odoo.stdin" not in ctx.meta:
+                ctx.meta["click_odoo.stdin"] = sys.stdin.read()
+            exec(ctx.meta["click_odoo.stdin"], global_vars)
+
+
+def _run_jsonl(env, global_vars, batch_size):
+    handler = global_vars.get(jsonl.HANDLER)
+    if not callable(handler):
+        raise click.UsageError(
+            "With --jsonl, the script must define a {}(env, records) function.".format(
+                jsonl.HANDLER
+            )
+        )
+    ctx = click.get_current_context()
+    failed = jsonl.run(
+        env,
+        handler,
+        sys.stdin,
+        sys.stdout,
+        sys.stderr,
+        batch_size=batch_size,
+        rollback=ctx.meta.get("click_odoo.rollback", False),
+    )
+    if failed:
+        click.echo("{} batches failed.".format(failed), err=True)
+        ctx.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,30 +1,99 @@
 import contextlib
+import sys
+import time
+
+from . import timings
 
 __all__ = [
     "Environment",
     "environment_manage",
+    "flush_all",
+    "invalidate_all",
     "odoo",
     "odoo_bin",
+    "odoo_import_time",
     "odoo_version_info",
 ]
 
-import odoo
-from odoo.api import Environment
-from odoo.release import version_info as odoo_version_info
+# odoo, Environment, environment_manage and odoo_version_info
+# are only available once odoo has been imported by _load()
+_LAZY_NAMES = ("odoo", "Environment", "environment_manage", "odoo_version_info")
 
 odoo_bin = "odoo"
 
+# (wall, cpu) time spent importing odoo, once it is imported
+odoo_import_time = None
+
+
+@contextlib.contextmanager
+def _environment_manage():
+    # Environment.manage is a no-op in Odoo 15+, but it
+    # emits a noisy warning so let's avoid it.
+    yield
+
+
+def _load():
+    global odoo, Environment, environment_manage, odoo_version_info
+    global odoo_import_time
+
+    start = time.perf_counter(), time.process_time()
+
+    import odoo
+    import odoo.modules.registry
+    from odoo.api import Environment
+    from odoo.release import version_info as odoo_version_info
+
+    if odoo_version_info < (15, 0):
+        environment_manage = Environment.manage
+    else:
+        environment_manage = _environment_manage
+
+    if odoo_version_info >= (19, 0):
+        import odoo.init  # noqa: F401
+
+    odoo_import_time = (
+        time.perf_counter() - start[0],
+        time.process_time() - start[1],
+    )
+    timings.add("import odoo", *odoo_import_time)
+
+
+def _odoo_version_info():
+    # the module __getattr__ does not apply to the globals of this module
+    if "odoo_version_info" not in globals():
+        _load()
+    return odoo_version_info
+
+
+def flush_all(env):
+    """Write the pending updates of the ORM to the database."""
+    version_info = _odoo_version_info()
+    if version_info >= (16, 0):
+        env.flush_all()
+    elif version_info >= (13, 0):
+        env["base"].flush()
+    # before Odoo 13, updates are written immediately
+
+
+def invalidate_all(env):
+    """Clear the ORM cache, without flushing it."""
+    version_info = _odoo_version_info()
+    if version_info >= (16, 0):
+        env.invalidate_all(flush=False)
+    elif version_info >= (13, 0):
+        env["base"].invalidate_cache()
+    else:
+        env.invalidate_all()
 
-if odoo_version_info < (15, 0):
-    environment_manage = Environment.manage
-else:
 
-    @contextlib.contextmanager
-    def environment_manage():
-        # Environment.manage is a no-op in Odoo 15+, but it
-        # emits a noisy warning so let's avoid it.
-        yield
+def __getattr__(name):
+    # importing odoo is slow, so do it only when needed (PEP 562)
+    if name in _LAZY_NAMES:
+        _load()
+        return globals()[name]
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
-if odoo_version_info >= (19, 0):
-    import odoo.init
+if sys.version_info < (3, 7):
+    # no module __getattr__ support
+    _load()
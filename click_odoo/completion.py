@@ -0,0 +1,262 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Completion of model names and record attributes in the interactive console.
+
+The names, fields and methods of the models of a registry are collected
+once, and cached on disk for the next sessions with the same registry, so
+completing ``env['res.pa`` or ``partner.na`` neither introspects the models
+nor reads fields at each key press.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+_logger = logging.getLogger(__name__)
+
+# expressions that use the environment
+_ENV_NAME = re.compile(r"\benv\b")
+# env['res.pa
+_MODEL_NAME = re.compile(r"""\benv\s*\[\s*(['"])([\w.]*)$""")
+# partner.na, env.user.na, env['res.partner'].na: no calls, which are
+# not evaluated to complete
+_ATTRIBUTE = re.compile(
+    r"""([A-Za-z_]\w*(?:\.\w+|\[\s*(['"])[\w.]*\2\s*\])*)\.(\w*)$"""
+)
+
+
+def cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join("~", ".cache")
+    return os.path.join(os.path.expanduser(base), "click-odoo")
+
+
+def registry_signature(registry):
+    """Hash of the Odoo version, installed modules, models and fields."""
+    from .compat import odoo
+
+    models = sorted((name, sorted(registry[name]._fields)) for name in registry)
+    key = json.dumps(
+        [odoo.release.version, sorted(registry._init_modules), models],
+        sort_keys=True,
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _attributes(cls):
+    """Return the fields and methods of a model class."""
+    fields = set(cls._fields)
+    methods = set()
+    for name in dir(cls):
+        if name.startswith("__") or name in fields:
+            continue
+        try:
+            if callable(getattr(cls, name)):
+                methods.add(name)
+        except Exception:
+            continue
+    return fields, methods
+
+
+class CompletionIndex:
+    """Fields and methods of the models of a registry.
+
+    The attributes of the ``base`` model, which all models have, are only
+    stored once.
+    """
+
+    def __init__(self, signature, base, models):
+        self.signature = signature
+        self.base = base
+        self.models = models
+
+    @classmethod
+    def build(cls, registry):
+        base_fields, base_methods = _attributes(registry["base"])
+        models = {}
+        for name in registry:
+            fields, methods = _attributes(registry[name])
+            models[name] = [
+                sorted(fields - base_fields),
+                sorted(methods - base_methods),
+            ]
+        base = [sorted(base_fields), sorted(base_methods)]
+        return cls(registry_signature(registry), base, models)
+
+    @classmethod
+    def load(cls, registry):
+        """Return the index of the registry, from the cache if it is there."""
+        signature = registry_signature(registry)
+        path = os.path.join(cache_dir(), "completion-{}.json".format(signature))
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls(signature, data["base"], data["models"])
+        except (OSError, ValueError, KeyError):
+            pass
+        index = cls.build(registry)
+        try:
+            index.save(path)
+        except OSError as e:
+            _logger.debug("Could not cache the completion index: %s", e)
+        return index
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "w") as f:
+            json.dump({"base": self.base, "models": self.models}, f)
+        os.replace(tmp_path, path)
+
+    def model_names(self, prefix):
+        return sorted(name for name in self.models if name.startswith(prefix))
+
+    def attributes(self, model, prefix):
+        """Return (name, is_method) tuples of the attributes of ``model``.
+
+        Private attributes are only returned when the prefix starts with _.
+        """
+        fields, methods = self.models.get(model, ([], []))
+        names = [(name, False) for name in self.base[0] + fields]
+        names += [(name, True) for name in self.base[1] + methods]
+        return sorted(
+            (name, is_method)
+            for name, is_method in names
+            if name.startswith(prefix) and (prefix[:1] == "_" or name[:1] != "_")
+        )
+
+
+class Completer:
+    """Completion of the code before the cursor, in a console namespace."""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._index = None
+        self._registry = None
+
+    def index(self):
+        """Return the index of the registry of ``env``, or None.
+
+        A lazy environment that is not loaded yet is not loaded to complete.
+        """
+        env = self.namespace.get("env")
+        if not env or not getattr(env, "materialized", True):
+            return None
+        if self._registry is not env.registry:
+            self._index = CompletionIndex.load(env.registry)
+            self._registry = env.registry
+        return self._index
+
+    def matches(self, line):
+        """Return the prefix to complete and the completions, or None.
+
+        None means the code is not a model name or a record attribute,
+        and is left to the default completion of the console.
+        """
+        match = _MODEL_NAME.search(line)
+        if match:
+            index = self.index()
+            if index is None:
+                return None
+            prefix = match.group(2)
+            return prefix, index.model_names(prefix)
+        match = _ATTRIBUTE.search(line)
+        if match:
+            expr, prefix = match.group(1), match.group(3)
+            env = self.namespace.get("env")
+            if env is not None and not getattr(env, "materialized", True):
+                # evaluating the expression would load the lazy environment
+                if _ENV_NAME.search(expr):
+                    return prefix, []
+                return None
+
+            from .compat import odoo
+
+            try:
+                value = eval(expr, self.namespace)
+            except Exception:
+                return None
+            if not isinstance(value, odoo.models.BaseModel):
+                return None
+            index = self.index()
+            if index is None:
+                return None
+            return prefix, [
+                name + "(" if is_method else name
+                for name, is_method in index.attributes(value._name, prefix)
+            ]
+        return None
+
+
+class ReadlineCompleter:
+    """readline completer, falling back to ``rlcompleter``."""
+
+    def __init__(self, namespace):
+        import rlcompleter
+
+        self.completer = Completer(namespace)
+        self.fallback = rlcompleter.Completer(namespace)
+        self.completions = []
+
+    def complete(self, text, state):
+        import readline
+
+        if state == 0:
+            line = readline.get_line_buffer()[: readline.get_endidx()]
+            result = self.completer.matches(line)
+            if result is None:
+                self.completions = None
+            else:
+                # readline replaces text, that may start before the prefix
+                prefix, names = result
+                start = text[: len(text) - len(prefix)]
+                self.completions = [start + name for name in names]
+        if self.completions is None:
+            return self.fallback.complete(text, state)
+        if state < len(self.completions):
+            return self.completions[state]
+        return None
+
+
+def load_ipython_extension(ipython):
+    """Complete model names and record attributes in IPython.
+
+    It can also be loaded with ``%load_ext click_odoo.completion``.
+    """
+    completer = Completer(ipython.user_ns)
+
+    def matcher(text):
+        line = ipython.Completer.text_until_cursor
+        result = completer.matches(line)
+        if not result:
+            return []
+        prefix, names = result
+        start = text[: len(text) - len(prefix)]
+        return [start + name.rstrip("(") for name in names]
+
+    ipython.Completer.custom_matchers.insert(0, matcher)
+
+
+def configure_ptpython(repl, namespace):
+    """Complete model names and record attributes in ptpython."""
+    from prompt_toolkit.completion import Completer as BaseCompleter
+    from prompt_toolkit.completion import Completion
+
+    completer = Completer(namespace)
+
+    class PromptToolkitCompleter(BaseCompleter):
+        def __init__(self, fallback):
+            self.fallback = fallback
+
+        def get_completions(self, document, complete_event):
+            result = completer.matches(document.text_before_cursor)
+            if result is None:
+                yield from self.fallback.get_completions(document, complete_event)
+                return
+            prefix, names = result
+            for name in names:
+                yield Completion(name, start_position=-len(prefix))
+
+    repl.completer = PromptToolkitCompleter(repl.completer)
@@ -4,33 +4,124 @@
 import code
 import logging
 import os
+import sys
+import time
+from contextlib import contextmanager
+
+from . import completion, sqlstats
 
 _logger = logging.getLogger(__name__)
 
 
+class SqlMonitor:
+    """Report the SQL queries of each statement entered in the console.
+
+    It is available in the console as ``sqltrace``: ``sqltrace()`` prints
+    the normalized queries of the previous statement, and
+    ``sqltrace(True)`` prints them after each statement.
+    """
+
+    def __init__(self, env, stream=None):
+        self.env = env
+        self.stream = stream or sys.stderr
+        self.trace = False
+        self.last = None
+        self._current = None
+        self._uninstrument = None
+
+    def _record(self, cr, query, params, elapsed):
+        if self._current is not None:
+            self._current.record(cr, query, params, elapsed)
+
+    @contextmanager
+    def statement(self):
+        # a lazy environment is instrumented once it is loaded
+        if self._uninstrument is None and getattr(self.env, "materialized", True):
+            self._uninstrument = sqlstats.instrument_cursor(self.env.cr, self._record)
+        self._current = stats = sqlstats.QueryStats()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._current = None
+            self.last = stats
+            self.stream.write(
+                "SQL: {} queries in {:.3f}s, {:.3f}s elapsed\n".format(
+                    stats.count, stats.duration, elapsed
+                )
+            )
+            if self.trace and stats.count:
+                stats.report(self.stream)
+
+    def close(self):
+        if self._uninstrument is not None:
+            self._uninstrument()
+            self._uninstrument = None
+
+    def __call__(self, trace=None):
+        if trace is not None:
+            self.trace = bool(trace)
+        elif self.last is not None:
+            self.last.report(self.stream)
+
+    def __repr__(self):
+        return "<sqltrace {}>".format("on" if self.trace else "off")
+
+
+class _InteractiveConsole(code.InteractiveConsole):
+    def __init__(self, locals, sql_monitor=None):
+        super().__init__(locals=locals)
+        self.sql_monitor = sql_monitor
+
+    def runcode(self, code):
+        if self.sql_monitor is None:
+            return super().runcode(code)
+        with self.sql_monitor.statement():
+            return super().runcode(code)
+
+
+def _sql_monitor(local_vars):
+    monitor = local_vars.get("sqltrace")
+    return monitor if isinstance(monitor, SqlMonitor) else None
+
+
 class Shell:
     shells = ["ipython", "ptpython", "bpython", "python"]
 
     @classmethod
     def python(cls, local_vars):
-        console = code.InteractiveConsole(locals=local_vars)
+        console = _InteractiveConsole(local_vars, _sql_monitor(local_vars))
         import readline
-        import rlcompleter  # noqa
 
+        readline.set_completer(completion.ReadlineCompleter(local_vars).complete)
         readline.parse_and_bind("tab: complete")
         console.interact()
 
     @classmethod
     def ipython(cls, local_vars):
-        from IPython import start_ipython
+        from IPython.terminal.ipapp import TerminalIPythonApp
 
-        start_ipython(argv=[], user_ns=local_vars)
+        # what IPython.start_ipython does, with completion of models
+        app = TerminalIPythonApp.instance(user_ns=local_vars)
+        app.initialize(argv=[])
+        completion.load_ipython_extension(app.shell)
+        monitor = _sql_monitor(local_vars)
+        if monitor:
+            _ipython_sql_monitor(app.shell, monitor)
+        app.start()
 
     @classmethod
     def ptpython(cls, local_vars):
         from ptpython.repl import embed
 
-        embed({}, local_vars)
+        def configure(repl):
+            completion.configure_ptpython(repl, local_vars)
+            monitor = _sql_monitor(local_vars)
+            if monitor:
+                _ptpython_sql_monitor(repl, monitor)
+
+        embed({}, local_vars, configure=configure)
 
     @classmethod
     def bpython(cls, local_vars):
@@ -57,6 +148,47 @@ class Shell:
         _logger.error("Could not start any shell.")
 
 
+def _ptpython_sql_monitor(repl, monitor):
+    run = repl.run_and_show_expression
+
+    def run_and_show_expression(expression):
+        with monitor.statement():
+            return run(expression)
+
+    repl.run_and_show_expression = run_and_show_expression
+    # the REPL of embed(return_asyncio_coroutine=True), ptpython >= 3
+    run_async = getattr(repl, "run_and_show_expression_async", None)
+    if run_async is not None:
+
+        async def run_and_show_expression_async(expression):
+            with monitor.statement():
+                return await run_async(expression)
+
+        repl.run_and_show_expression_async = run_and_show_expression_async
+
+
+def _ipython_sql_monitor(ipython, monitor):
+    statements = []
+
+    def pre_run_cell(*args):
+        statement = monitor.statement()
+        statement.__enter__()
+        statements.append(statement)
+
+    def post_run_cell(*args):
+        while statements:
+            statements.pop().__exit__(None, None, None)
+
+    def sqltrace(line):
+        """Print the SQL queries of the previous cell, or turn tracing on or off."""
+        line = line.strip().lower()
+        monitor(line == "on" if line in ("on", "off") else None)
+
+    ipython.events.register("pre_run_cell", pre_run_cell)
+    ipython.events.register("post_run_cell", post_run_cell)
+    ipython.register_magic_function(sqltrace, "line")
+
+
 def _isatty(stream):
     try:
         return os.isatty(stream.fileno())
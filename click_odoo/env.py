@@ -2,23 +2,43 @@
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
 
 import logging
-from contextlib import contextmanager
+import threading
+import time
+from contextlib import ExitStack, contextmanager
 
-from .compat import Environment, environment_manage, odoo
-import odoo.modules.registry
+import click
+
+from . import timings
 
 _logger = logging.getLogger(__name__)
 
 
 @contextmanager
-def OdooEnvironment(database, rollback=False, **kwargs):
+def OdooEnvironment(
+    database,
+    rollback=False,
+    keep_registry=False,
+    cursor_hooks=(),
+    readonly=False,
+    replica=None,
+    isolation_level="repeatable read",
+    **kwargs,
+):
+    from .compat import Environment, environment_manage, flush_all, odoo
+
     with environment_manage():
-        registry = odoo.modules.registry.Registry(database)
+        with timings.registry_phase():
+            registry = odoo.modules.registry.Registry(database)
         try:
-            with registry.cursor() as cr:
+            with _cursor(registry, database, replica) as cr, ExitStack() as hooks:
+                if readonly or replica:
+                    hooks.enter_context(_readonly_session(cr, isolation_level))
+                for hook in cursor_hooks:
+                    hooks.enter_context(hook(cr))
                 uid = odoo.SUPERUSER_ID
                 try:
-                    ctx = Environment(cr, uid, {})["res.users"].context_get()
+                    with timings.phase("context_get"):
+                        ctx = Environment(cr, uid, {})["res.users"].context_get()
                 except Exception as e:
                     ctx = {"lang": "en_US"}
                     # this happens, for instance, when there are new
@@ -32,10 +52,173 @@ def OdooEnvironment(database, rollback=False, **kwargs):
                 env = Environment(cr, uid, ctx)
                 cr.rollback()
                 yield env
-                if rollback:
+                if readonly or replica:
+                    # fail on pending updates, instead of discarding them
+                    flush_all(env)
                     cr.rollback()
+                elif rollback:
+                    with timings.phase("rollback"):
+                        cr.rollback()
                 else:
-                    cr.commit()
+                    with timings.phase("commit"):
+                        cr.commit()
         finally:
-            odoo.modules.registry.Registry.delete(database)
-            odoo.sql_db.close_db(database)
+            if not keep_registry:
+                odoo.modules.registry.Registry.delete(database)
+                odoo.sql_db.close_db(database)
+                if replica:
+                    odoo.sql_db.close_db(replica)
+
+
+def _cursor(registry, database, replica):
+    from .compat import odoo
+
+    if not replica:
+        return registry.cursor()
+    cr = odoo.sql_db.db_connect(replica, allow_uri=True).cursor()
+    # environments find their registry by the database name of the cursor
+    cr.dbname = database
+    return cr
+
+
+ISOLATION_LEVELS = ("read committed", "repeatable read", "serializable")
+
+
+@contextmanager
+def _readonly_session(cr, isolation_level):
+    """Run the transactions of the cursor in read only mode."""
+    if isolation_level not in ISOLATION_LEVELS:
+        raise ValueError("Unsupported isolation level {}.".format(isolation_level))
+    cnx = cr._cnx
+    session = cnx.isolation_level, cnx.readonly, cnx.deferrable
+    # the session cannot be changed in a transaction
+    cr.rollback()
+    cnx.set_session(
+        isolation_level=isolation_level.upper(),
+        readonly=True,
+        # a serializable read only transaction never fails, once started
+        deferrable=isolation_level == "serializable",
+    )
+    try:
+        yield
+    finally:
+        # the connection goes back to the pool of the cursor
+        cr.rollback()
+        cnx.set_session(*("DEFAULT" if value is None else value for value in session))
+
+
+class LazyEnvironment:
+    """Proxy of an environment that is created when it is first used.
+
+    ``environment_manager`` is called with ``kwargs`` and entered on the
+    first attribute or item access, so commands that exit early do not pay
+    for loading the registry. Used as a context manager, the environment
+    manager is exited, committing or rolling back, only if it was entered.
+    """
+
+    def __init__(self, environment_manager, **kwargs):
+        self._lazy_factory = environment_manager
+        self._lazy_kwargs = kwargs
+        self._lazy_manager = None
+        self._lazy_env = None
+        self._lazy_prewarm = None
+
+    @property
+    def materialized(self):
+        return self._lazy_env is not None
+
+    def prewarm(self):
+        """Load the registry of the database in a background thread.
+
+        The environment is created, in the calling thread, when it is first
+        used, waiting for the registry if it is not loaded yet.
+        """
+        if self._lazy_env is not None or self._lazy_prewarm is not None:
+            return
+        database = self._lazy_kwargs["database"]
+        self._lazy_prewarm = threading.Thread(
+            target=_load_registry, args=(database,), name="click-odoo-prewarm"
+        )
+        self._lazy_prewarm.daemon = True
+        click.echo(
+            "Loading the registry of {} in the background, "
+            "env will be ready when it is loaded.".format(database),
+            err=True,
+        )
+        self._lazy_prewarm.start()
+
+    def _wait_prewarm(self):
+        if self._lazy_prewarm is None:
+            return
+        if self._lazy_prewarm.is_alive():
+            click.echo("Waiting for the registry to be loaded...", err=True)
+            self._lazy_prewarm.join()
+        self._lazy_prewarm = None
+
+    def _materialize(self):
+        if self._lazy_env is None:
+            self._wait_prewarm()
+            manager = self._lazy_factory(**self._lazy_kwargs)
+            env = manager.__enter__()
+            self._lazy_manager, self._lazy_env = manager, env
+        return self._lazy_env
+
+    def __getattr__(self, name):
+        if name.startswith("_lazy_"):
+            # not initialized yet, e.g. while copying
+            raise AttributeError(name)
+        return getattr(self._materialize(), name)
+
+    def __getitem__(self, model_name):
+        return self._materialize()[model_name]
+
+    def __contains__(self, model_name):
+        return model_name in self._materialize()
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __len__(self):
+        return len(self._materialize())
+
+    def __call__(self, *args, **kwargs):
+        return self._materialize()(*args, **kwargs)
+
+    def __bool__(self):
+        # like an environment, without materializing it for `if env:`
+        return True
+
+    def __repr__(self):
+        if self._lazy_env is None:
+            return "<LazyEnvironment (not loaded)>"
+        return repr(self._lazy_env)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # do not leave a thread using the database behind
+        self._wait_prewarm()
+        if self._lazy_manager is None:
+            return False
+        return self._lazy_manager.__exit__(exc_type, exc_value, traceback)
+
+
+def _load_registry(database):
+    """Load the registry of ``database``, reporting when it is ready."""
+    from .compat import environment_manage, odoo
+
+    start = time.perf_counter()
+    try:
+        with environment_manage(), timings.registry_phase():
+            odoo.modules.registry.Registry(database)
+    except Exception as e:
+        # the error is raised again when the environment is used
+        click.echo("\nLoading the registry failed: {}".format(e), err=True)
+    else:
+        click.echo(
+            "\nRegistry of {} loaded in {:.1f}s, env is ready.".format(
+                database, time.perf_counter() - start
+            ),
+            err=True,
+        )
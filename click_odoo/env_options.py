@@ -2,17 +2,57 @@
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
 
 import logging
-from contextlib import closing
+import sys
+from contextlib import ExitStack, closing, contextmanager
 from typing import Optional
 
 import click
 from click.decorators import _param_memo  # XXX undocumented click internal
 
-from .compat import environment_manage
-from .env import OdooEnvironment, odoo
+from . import (
+    lockwatch,
+    memory,
+    multidb,
+    profiling,
+    retry,
+    schedule,
+    sqlstats,
+    timeouts,
+    timings,
+)
+from .env import ISOLATION_LEVELS, LazyEnvironment, OdooEnvironment
 
 _logger = logging.getLogger(__name__)
 
+# params of the options that are always present
+_BASE_PARAMS = ("config", "addons_path", "database", "log_level", "logfile", "rollback")
+
+# params of the options enabled by each with_* flag
+_OPTIONAL_PARAMS = (
+    ("with_multi_database", ("all_databases", "jobs", "results_file")),
+    ("with_timings", ("timings", "timings_file")),
+    ("with_profile", ("profile",)),
+    (
+        "with_sql_stats",
+        ("sql_stats", "sql_stats_file", "slow_queries", "slow_query_threshold"),
+    ),
+    ("with_memory_limits", ("soft_memory_limit", "hard_memory_limit")),
+    ("with_lazy_env", ("lazy_env",)),
+    ("with_retries", ("retries", "retry_delay")),
+    ("with_readonly", ("readonly", "replica", "isolation_level")),
+    (
+        "with_timeouts",
+        (
+            "statement_timeout",
+            "lock_timeout",
+            "idle_in_transaction_timeout",
+            "deadline",
+        ),
+    ),
+    ("with_lock_watch", ("lock_watch",)),
+    ("with_every", ("every", "max_runs")),
+)
+
 
 class env_options:
     def __init__(
@@ -24,6 +64,18 @@ class env_options:
         database_must_exist=True,
         with_addons_path=False,
         environment_manager=OdooEnvironment,
+        with_multi_database=False,
+        with_timings=False,
+        with_profile=False,
+        with_sql_stats=False,
+        with_memory_limits=False,
+        with_lazy_env=False,
+        lazy_env=False,
+        with_retries=False,
+        with_readonly=False,
+        with_timeouts=False,
+        with_lock_watch=False,
+        with_every=False,
     ):
         self.default_log_level = default_log_level
         self.with_rollback = with_rollback
@@ -32,6 +84,18 @@ class env_options:
         self.database_must_exist = database_must_exist
         self.with_addons_path = with_addons_path
         self.environment_manager = environment_manager
+        self.with_multi_database = with_multi_database and with_database
+        self.with_timings = with_timings
+        self.with_profile = with_profile
+        self.with_sql_stats = with_sql_stats
+        self.with_memory_limits = with_memory_limits
+        self.with_lazy_env = with_lazy_env
+        self.lazy_env = lazy_env
+        self.with_retries = with_retries
+        self.with_readonly = with_readonly
+        self.with_timeouts = with_timeouts
+        self.with_lock_watch = with_lock_watch
+        self.with_every = with_every
 
     def __call__(self, f):
         # this is the decorator call which registers options in reverse order
@@ -49,6 +113,239 @@ class env_options:
                     "started.",
                 ),
             )
+        if self.with_every:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--max-runs",),
+                    type=click.IntRange(min=1),
+                    help="Stop after this number of runs, with --every.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--every",),
+                    type=click.FloatRange(min=0.1),
+                    metavar="SECONDS",
+                    help="Run the command again at this interval, in the same "
+                    "process and in a new transaction each time, until it is "
+                    "interrupted. The registry is reloaded only when another "
+                    "process changed it.",
+                ),
+            )
+        if self.with_lock_watch:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--lock-watch",),
+                    type=click.FloatRange(min=0.1),
+                    metavar="SECONDS",
+                    help="Sample the lock waits of the environment cursor at "
+                    "this interval from another connection, log what blocks "
+                    "it, and report the total lock-wait time at the end.",
+                ),
+            )
+        if self.with_timeouts:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--deadline",),
+                    type=click.FloatRange(min=0),
+                    metavar="SECONDS",
+                    help="Interrupt the command and rollback when it runs for "
+                    "longer than this, cancelling the running query.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--idle-in-transaction-timeout",),
+                    type=click.FloatRange(min=0),
+                    metavar="SECONDS",
+                    help="PostgreSQL idle_in_transaction_session_timeout of "
+                    "the environment cursor.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--lock-timeout",),
+                    type=click.FloatRange(min=0),
+                    metavar="SECONDS",
+                    help="PostgreSQL lock_timeout of the environment cursor.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--statement-timeout",),
+                    type=click.FloatRange(min=0),
+                    metavar="SECONDS",
+                    help="PostgreSQL statement_timeout of the environment cursor.",
+                ),
+            )
+        if self.with_readonly:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--isolation-level",),
+                    type=click.Choice(ISOLATION_LEVELS),
+                    default="repeatable read",
+                    show_default=True,
+                    help="Isolation level of the read only transaction.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--replica",),
+                    metavar="DSN",
+                    envvar=["CLICK_ODOO_REPLICA"],
+                    help="Run the command on this replica of the database, "
+                    "as a postgresql:// URI or a database name. The registry "
+                    "is loaded from the database. Implies --readonly.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--readonly",),
+                    is_flag=True,
+                    help="Run the command in a read only transaction, that "
+                    "is never committed. Writing to the database fails.",
+                ),
+            )
+        if self.with_retries:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--retry-delay",),
+                    type=click.FloatRange(min=0),
+                    default=0.5,
+                    show_default=True,
+                    metavar="SECONDS",
+                    help="Initial wait before retrying, doubled at each attempt, "
+                    "with random jitter.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--retries",),
+                    type=click.IntRange(min=0),
+                    default=0,
+                    show_default=True,
+                    help="Roll back and run the command again, up to this "
+                    "number of times, when it fails on a serialization "
+                    "failure or a deadlock. The command must be safe to run "
+                    "again after a rollback.",
+                ),
+            )
+        if self.with_lazy_env:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--lazy-env/--no-lazy-env",),
+                    default=None,
+                    help="Load the registry when the environment is first "
+                    "used, instead of before running the command, so "
+                    "commands that exit early do not wait for it.",
+                ),
+            )
+        if self.with_memory_limits:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--hard-memory-limit",),
+                    type=click.IntRange(min=1),
+                    metavar="MB",
+                    help="Abort and rollback when the resident memory of the "
+                    "process exceeds this limit, reporting the top allocations.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--soft-memory-limit",),
+                    type=click.IntRange(min=1),
+                    metavar="MB",
+                    help="Clear the ORM cache after commits when the resident "
+                    "memory of the process exceeds this limit.",
+                ),
+            )
+        if self.with_sql_stats:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--slow-query-threshold",),
+                    type=click.FloatRange(min=0),
+                    default=100,
+                    show_default=True,
+                    metavar="MS",
+                    help="Duration in milliseconds above which queries are "
+                    "logged by --slow-queries.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--slow-queries",),
+                    type=click.Path(dir_okay=False),
+                    help="Append the slow queries to this file, with the "
+                    "Python stack that executed them and their plan, "
+                    "obtained with EXPLAIN (ANALYZE, BUFFERS) in a "
+                    "savepoint that is rolled back.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--sql-stats-file",),
+                    type=click.Path(dir_okay=False),
+                    help="Write the SQL query statistics to this file, in json format.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--sql-stats",),
+                    is_flag=True,
+                    help="Print the number and duration of SQL queries, "
+                    "and the most expensive statements, on stderr at exit.",
+                ),
+            )
+        if self.with_profile:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--profile",),
+                    type=click.Path(dir_okay=False),
+                    help="Profile the command and write the statistics to "
+                    "this file, in pstats format, as well as collapsed "
+                    "stacks for flame graphs in the same file with a "
+                    ".collapsed suffix. A summary is printed on stderr.",
+                ),
+            )
+        if self.with_timings:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--timings-file",),
+                    type=click.Path(dir_okay=False),
+                    help="Write the duration of the startup phases "
+                    "to this file, in json format.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--timings",),
+                    is_flag=True,
+                    help="Print the wall clock and CPU time of the "
+                    "startup phases on stderr at exit.",
+                ),
+            )
         _param_memo(
             f,
             click.Option(
@@ -68,15 +365,57 @@ class env_options:
                 "warn, error.",
             ),
         )
+        if self.with_multi_database:
+            _param_memo(
+                f,
+                click.Option(
+                    ("--results-file",),
+                    type=click.Path(dir_okay=False),
+                    help="Append the result of each database to this "
+                    "file, as json lines.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--jobs", "-j"),
+                    default=1,
+                    show_default=True,
+                    type=click.IntRange(min=1),
+                    help="Number of databases processed in parallel "
+                    "when running on several databases.",
+                ),
+            )
+            _param_memo(
+                f,
+                click.Option(
+                    ("--all-databases",),
+                    is_flag=True,
+                    help="Run on all databases, honoring the dbfilter "
+                    "option of the Odoo configuration file.",
+                ),
+            )
         if self.with_database:
+            if self.with_multi_database:
+                database_help = (
+                    "Specify the database name, or a comma separated "
+                    "list of names or glob patterns to run on several "
+                    "databases. If present, this parameter takes "
+                    "precedence over the database provided in the Odoo "
+                    "configuration file."
+                )
+            else:
+                database_help = (
+                    "Specify the database name. If present, this "
+                    "parameter takes precedence over the database "
+                    "provided in the Odoo configuration file."
+                )
             _param_memo(
                 f,
                 click.Option(
                     ("--database", "-d"),
                     envvar=["PGDATABASE"],
-                    help="Specify the database name. If present, this "
-                    "parameter takes precedence over the database "
-                    "provided in the Odoo configuration file.",
+                    help=database_help,
                 ),
             )
         if self.with_addons_path:
@@ -126,7 +465,9 @@ class env_options:
             odoo_args.extend(["--config", config])
         if addons_path:
             odoo_args.extend(["--addons-path", addons_path])
-        if database:
+        if database and not (
+            self.with_multi_database and multidb.is_multi_database(database)
+        ):
             odoo_args.extend(["--database", database])
         if log_level:
             odoo_args.extend(["--log-level", log_level])
@@ -136,6 +477,8 @@ class env_options:
         return odoo_args
 
     def _configure_odoo(self, ctx):
+        from .compat import odoo
+
         odoo_args = self.get_odoo_args(ctx)
         # reset db_name in case we come from a previous run
         # where database has been set, in the second run there is no database
@@ -143,36 +486,49 @@ class env_options:
         odoo.tools.config["db_name"] = None
         # see https://github.com/odoo/odoo/commit/b122217f74
         odoo.tools.config["load_language"] = None
-        if odoo.release.version_info >= (18, 0):
-            odoo.tools.config.parse_config(odoo_args, setup_logging=True)
-        else:
-            odoo.tools.config.parse_config(odoo_args)
+        with timings.phase("parse_config"):
+            if odoo.release.version_info >= (18, 0):
+                odoo.tools.config.parse_config(odoo_args, setup_logging=True)
+            else:
+                odoo.tools.config.parse_config(odoo_args)
 
         from odoo.cli.server import report_configuration
 
-        report_configuration()
+        with timings.phase("report_configuration"):
+            report_configuration()
 
     def _db_exists(self, dbname):
-        conn = odoo.sql_db.db_connect("postgres")
-        with closing(conn.cursor()) as cr:
-            cr._obj.execute(
-                "SELECT datname FROM pg_catalog.pg_database "
-                "WHERE lower(datname) = lower(%s)",
-                (dbname,),
-            )
-            return bool(cr.fetchone())
+        from .compat import odoo
+
+        with timings.phase("db_exists"):
+            conn = odoo.sql_db.db_connect("postgres")
+            with closing(conn.cursor()) as cr:
+                cr._obj.execute(
+                    "SELECT datname FROM pg_catalog.pg_database "
+                    "WHERE lower(datname) = lower(%s)",
+                    (dbname,),
+                )
+                return bool(cr.fetchone())
 
     def _pop_params(self, ctx):
-        ctx.params.pop("config", None)
-        ctx.params.pop("addons_path", None)
-        ctx.params.pop("database", None)
-        ctx.params.pop("log_level", None)
-        ctx.params.pop("logfile", None)
-        ctx.params.pop("rollback", None)
+        """Pop env_options params, so they are not passed to the command.
+
+        Return a dictionary of the popped values. The params of options
+        that are not enabled are left to the command, and are None in the
+        dictionary.
+        """
+        options = {name: ctx.params.pop(name, None) for name in _BASE_PARAMS}
+        for flag, names in _OPTIONAL_PARAMS:
+            enabled = getattr(self, flag)
+            for name in names:
+                options[name] = ctx.params.pop(name, None) if enabled else None
+        return options
 
     @classmethod
     def _get_config_single_db_name(cls) -> Optional[str]:
         """Return the database name from the Odoo config if it is a single database."""
+        from .compat import odoo
+
         config_db_name = odoo.tools.config["db_name"]
         if not config_db_name:
             return None
@@ -185,34 +541,237 @@ class env_options:
         else:
             return None
 
+    def _invoke_command(self, ctx, options, database=None):
+        with timings.phase("command"):
+            if options["profile"]:
+                profile = options["profile"]
+                if database:
+                    profile = self._database_path(profile, database)
+                with profiling.profile(profile):
+                    return self.org_invoke(ctx)
+            return self.org_invoke(ctx)
+
+    def _get_cursor_hooks(self, database, options):
+        """Return the hooks to apply on the cursor of the environment.
+
+        A hook is called with the cursor and returns a context manager
+        that is entered when the cursor is created, and exited after the
+        transaction is committed or rolled back.
+        """
+        hooks = []
+        timeout_settings = {
+            "statement_timeout": options["statement_timeout"],
+            "lock_timeout": options["lock_timeout"],
+            "idle_in_transaction_session_timeout": options[
+                "idle_in_transaction_timeout"
+            ],
+        }
+        if any(timeout_settings.values()):
+            hooks.append(timeouts.settings_hook(**timeout_settings))
+        if options["deadline"]:
+            hooks.append(timeouts.cursor_hook)
+        if options["lock_watch"]:
+            hooks.append(
+                lockwatch.watch_hook(
+                    self._database_path(options["replica"], database) or database,
+                    interval=options["lock_watch"],
+                )
+            )
+        if options["sql_stats"] or options["sql_stats_file"]:
+            hooks.append(
+                sqlstats.stats_hook(
+                    stream=sys.stderr if options["sql_stats"] else None,
+                    path=self._database_path(options["sql_stats_file"], database),
+                )
+            )
+        if options["soft_memory_limit"]:
+            hooks.append(memory.cursor_hook)
+        if options["slow_queries"]:
+            # last, so the time spent explaining is not in the statistics
+            hooks.append(
+                sqlstats.slow_query_hook(
+                    path=self._database_path(options["slow_queries"], database),
+                    threshold=options["slow_query_threshold"] / 1000,
+                )
+            )
+        return hooks
+
+    @staticmethod
+    def _database_path(path, database):
+        """Substitute {database} in a file name, for multi database runs."""
+        if path:
+            return path.replace("{database}", database)
+        return path
+
+    @staticmethod
+    def _per_database(path):
+        return bool(path) and "{database}" in path
+
+    @contextmanager
+    def _database_timings(self, database, options):
+        """Write the timings of the run on ``database`` to its own file."""
+        try:
+            yield
+        finally:
+            if self._per_database(options["timings_file"]):
+                timings.dump(self._database_path(options["timings_file"], database))
+
+    @staticmethod
+    def _govern_memory(options):
+        soft_limit = options["soft_memory_limit"]
+        hard_limit = options["hard_memory_limit"]
+        if soft_limit or hard_limit:
+            return memory.govern(soft_limit, hard_limit)
+        return ExitStack()
+
+    @staticmethod
+    def _deadline(options):
+        if options["deadline"]:
+            return timeouts.deadline(options["deadline"])
+        return ExitStack()
+
+    def _use_lazy_env(self, ctx, options):
+        """Return True to pass a ``LazyEnvironment`` to the command."""
+        if options["lazy_env"] is None:
+            return self.lazy_env
+        return options["lazy_env"]
+
+    def _invoke_database(self, ctx, database, options):
+        from .compat import environment_manage
+
+        if (
+            self.with_database
+            and database
+            and (self.database_must_exist or self._db_exists(database))
+        ):
+            kwargs = {}
+            cursor_hooks = self._get_cursor_hooks(database, options)
+            if cursor_hooks:
+                kwargs["cursor_hooks"] = cursor_hooks
+            if options["readonly"] or options["replica"]:
+                kwargs["readonly"] = True
+                kwargs["replica"] = self._database_path(options["replica"], database)
+                kwargs["isolation_level"] = options["isolation_level"]
+            environment_manager = self.environment_manager
+            if self._use_lazy_env(ctx, options):
+                kwargs["environment_manager"] = environment_manager
+                environment_manager = LazyEnvironment
+
+            def invoke():
+                with environment_manager(
+                    database=database, rollback=options["rollback"], ctx=ctx, **kwargs
+                ) as env:
+                    ctx.params["env"] = env
+                    return self._invoke_command(ctx, options, database)
+
+            def run():
+                with self._govern_memory(options), self._deadline(options):
+                    if not options["retries"]:
+                        return invoke()
+                    return retry.run_with_retry(
+                        invoke, options["retries"], options["retry_delay"]
+                    )
+
+            if not options["retries"] and not options["every"]:
+                return run()
+            # the registry is loaded once for all attempts and runs
+            kwargs["keep_registry"] = True
+            try:
+                if not options["every"]:
+                    return run()
+                return schedule.run_every(
+                    run,
+                    options["every"],
+                    options["max_runs"],
+                    before_run=lambda: schedule.check_registry(database),
+                )
+            finally:
+                self._release_registry(database)
+        else:
+            with self._govern_memory(options), self._deadline(options):
+                with environment_manage():
+                    ctx.params["env"] = None
+                    return self._invoke_command(ctx, options, database)
+
+    @staticmethod
+    def _release_registry(database):
+        from .compat import odoo
+
+        odoo.modules.registry.Registry.delete(database)
+        odoo.sql_db.close_db(database)
+
+    def _invoke_databases(self, ctx, databases, options):
+        if not databases:
+            raise click.UsageError("No database matches.")
+
+        def invoke_database(database):
+            with self._database_timings(database, options):
+                return self._invoke_database(ctx, database, options)
+
+        results = multidb.run_databases(
+            invoke_database,
+            databases,
+            jobs=options["jobs"],
+            results_file=options["results_file"],
+        )
+        failed = [r for r in results if r["status"] != "ok"]
+        if failed:
+            click.echo(
+                "{} of {} databases failed.".format(len(failed), len(results)),
+                err=True,
+            )
+            ctx.exit(1)
+
     def _invoke(self, ctx):
+        show_timings = timings_file = None
+        if self.with_timings:
+            show_timings = ctx.params.get("timings")
+            timings_file = ctx.params.get("timings_file")
+        if show_timings or timings_file:
+            recorder = timings.start()
+            try:
+                return self._invoke_main(ctx)
+            finally:
+                timings.stop()
+                if show_timings:
+                    recorder.report(sys.stderr)
+                if timings_file and not self._per_database(timings_file):
+                    # otherwise written for each database by _database_timings
+                    recorder.dump(timings_file)
+        return self._invoke_main(ctx)
+
+    def _invoke_main(self, ctx):
         try:
             self._configure_odoo(ctx)
-            database = ctx.params.get("database")
+            options = self._pop_params(ctx)
+            # for commands that commit by themselves
+            ctx.meta["click_odoo.rollback"] = (
+                options["rollback"] or options["readonly"] or bool(options["replica"])
+            )
+            # for the interactive console
+            ctx.meta["click_odoo.sql_stats"] = options["sql_stats"]
+            # for commands that cannot run again
+            ctx.meta["click_odoo.retries"] = options["retries"]
+            ctx.meta["click_odoo.every"] = options["every"]
+            database = options["database"]
+            databases = None
+            if self.with_multi_database:
+                databases = multidb.expand_databases(database, options["all_databases"])
             if not database:
                 database = self._get_config_single_db_name()
-            rollback = ctx.params.get("rollback")
-            # pop env_options params so they are not passed to the command
-            self._pop_params(ctx)
+            if databases is not None:
+                if options["every"]:
+                    raise click.UsageError("--every runs on a single database.")
+                return self._invoke_databases(ctx, databases, options)
+            if options["every"] and not (self.with_database and database):
+                raise click.UsageError("--every requires a database.")
             if self.with_database and self.database_required and not database:
                 raise click.UsageError(
                     "No database provided, please provide one with the -d "
                     "option or the Odoo configuration file."
                 )
-            if (
-                self.with_database
-                and database
-                and (self.database_must_exist or self._db_exists(database))
-            ):
-                with self.environment_manager(
-                    database=database, rollback=rollback, ctx=ctx
-                ) as env:
-                    ctx.params["env"] = env
-                    return self.org_invoke(ctx)
-            else:
-                with environment_manage():
-                    ctx.params["env"] = None
-                    return self.org_invoke(ctx)
+            with self._database_timings(database or "", options):
+                return self._invoke_database(ctx, database, options)
         except click.exceptions.Exit:
             raise
         except Exception as e:
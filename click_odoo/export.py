@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Streaming export of records to CSV or JSON lines."""
+
+import ast
+import csv
+import json
+import logging
+import os
+import sys
+
+import click
+
+from .compat import flush_all, invalidate_all
+from .env_options import env_options
+
+_logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+CURSOR_NAME = "click_odoo_export"
+
+
+def _ids_query(model, domain):
+    """Return the SQL query and parameters of the ids matching ``domain``.
+
+    Return None if no record can match the domain.
+    """
+    from .compat import odoo_version_info
+
+    if odoo_version_info >= (17, 0):
+        sql = model._search(domain).select()
+        return sql.code, sql.params
+    if odoo_version_info >= (14, 0):
+        query = model._search(domain)
+        if isinstance(query, list):
+            # an empty list, when the domain is always false
+            return None
+        return query.select()
+    query = model._where_calc(domain)
+    model._apply_ir_rules(query, "read")
+    from_clause, where_clause, params = query.get_sql()
+    return (
+        'SELECT "{}".id FROM {} WHERE {}'.format(
+            model._table, from_clause, where_clause or "TRUE"
+        ),
+        params,
+    )
+
+
+def _display_names(records):
+    from .compat import odoo_version_info
+
+    records = records.exists()
+    if odoo_version_info >= (17, 0):
+        return {record.id: record.display_name for record in records}
+    return dict(records.name_get())
+
+
+class _Column:
+    """Conversion of the database values of a field to exported values."""
+
+    def __init__(self, model, name):
+        from .compat import odoo_version_info
+
+        if name == "id":
+            self.name, self.type, self.column = name, "integer", "id"
+            self.comodel, self.translate = None, False
+            return
+        field = model._fields.get(name)
+        if field is None:
+            raise ValueError("{} has no field {}.".format(model._name, name))
+        if not field.store or not field.column_type:
+            raise ValueError(
+                "Field {} of {} is not stored in a column of {}.".format(
+                    name, model._name, model._table
+                )
+            )
+        self.name = name
+        self.type = field.type
+        self.column = name
+        self.comodel = field.comodel_name if field.type == "many2one" else None
+        # translated fields are stored as jsonb since Odoo 16
+        self.translate = bool(field.translate) and odoo_version_info >= (16, 0)
+        if field.type == "selection":
+            description = field.get_description(model.env)
+            self.labels = dict(description["selection"])
+
+    def convert(self, values, env, lang, as_pairs):
+        """Convert the values of a chunk, in place."""
+        if self.translate:
+            values[:] = [
+                v.get(lang) or v.get("en_US") if isinstance(v, dict) else v
+                for v in values
+            ]
+        elif self.comodel:
+            # one lookup for the chunk
+            ids = {v for v in values if v}
+            names = _display_names(env[self.comodel].browse(ids)) if ids else {}
+            values[:] = [
+                ([v, names.get(v)] if as_pairs else names.get(v)) if v else None
+                for v in values
+            ]
+        elif self.type == "selection":
+            values[:] = [self.labels.get(v, v) if v else None for v in values]
+
+
+def _writer(output, format, names):
+    if format == "csv":
+        writer = csv.writer(output)
+        writer.writerow(names)
+        return writer.writerow
+
+    def write_jsonl(row):
+        output.write(json.dumps(dict(zip(names, row)), default=str) + "\n")
+
+    return write_jsonl
+
+
+def export(env, model, domain, fields, output, format="csv", chunk_size=2000):
+    """Write the ``fields`` of the records of ``model`` matching ``domain``.
+
+    The records are read in ``id`` order through a server side cursor, by
+    chunks of ``chunk_size`` rows, and written to the ``output`` text stream
+    as they are read, so memory use does not depend on the number of records.
+    Only fields stored in a column of the model table are supported.
+    Many2one fields are exported as the display name of the related record
+    (and as ``[id, display name]`` in JSON lines), and selection fields as
+    their label.
+
+    Return the number of exported records.
+    """
+    if format not in FORMATS:
+        raise ValueError("Unsupported export format {}.".format(format))
+    model = env[model]
+    columns = [_Column(model, name) for name in fields]
+    lang = env.context.get("lang") or "en_US"
+    ids_query = _ids_query(model, domain)
+    write = _writer(output, format, fields)
+    if ids_query is None:
+        output.flush()
+        return 0
+    query, params = ids_query
+    select = 'SELECT {} FROM "{}" WHERE id IN ({}) ORDER BY id'.format(
+        ", ".join('"{}"'.format(c.column) for c in columns), model._table, query
+    )
+    flush_all(env)
+    count = 0
+    # a named cursor is a server side cursor: rows are transferred by chunks
+    with env.cr._cnx.cursor(name=CURSOR_NAME) as cr:
+        cr.execute(select, params)
+        while True:
+            rows = cr.fetchmany(chunk_size)
+            if not rows:
+                break
+            values = [list(v) for v in zip(*rows)]
+            for column, column_values in zip(columns, values):
+                column.convert(column_values, env, lang, format == "jsonl")
+            for row in zip(*values):
+                write(row)
+            count += len(rows)
+            invalidate_all(env)
+    output.flush()
+    return count
+
+
+@click.command(
+    help="Export the FIELDS of the records of MODEL to a CSV or JSON lines "
+    "file. Records are streamed from the database, so any number of "
+    "records can be exported with constant memory."
+)
+@env_options(with_rollback=False, with_addons_path=True, with_readonly=True)
+@click.option("--model", "-m", required=True, help="Model to export.")
+@click.option(
+    "--fields",
+    "-f",
+    required=True,
+    help="Comma separated list of fields to export. Only fields stored in the "
+    "table of the model are supported.",
+)
+@click.option(
+    "--domain",
+    default="[]",
+    show_default=True,
+    help="Domain of the records to export, as a python literal.",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, allow_dash=True),
+    default="-",
+    help="Output file (default: stdout).",
+)
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice(FORMATS),
+    help="Output format (default: from the output file extension, or csv).",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=2000,
+    show_default=True,
+    help="Number of rows fetched at once from the database.",
+)
+def main(env, model, fields, domain, output, format_, chunk_size):
+    try:
+        domain = ast.literal_eval(domain)
+    except (SyntaxError, ValueError) as e:
+        raise click.BadParameter(str(e), param_hint="--domain")
+    if not format_:
+        extension = os.path.splitext(output)[1].lstrip(".")
+        format_ = extension if extension in FORMATS else "csv"
+    fields = [f.strip() for f in fields.split(",") if f.strip()]
+    if output == "-":
+        count = export(env, model, domain, fields, sys.stdout, format_, chunk_size)
+    else:
+        with open(output, "w", newline="") as f:
+            count = export(env, model, domain, fields, f, format_, chunk_size)
+    _logger.info("%s %s records exported.", count, model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Processing of a stream of JSON lines by batches."""
+
+import itertools
+import json
+import logging
+import traceback
+
+from . import memory
+from .compat import flush_all, invalidate_all
+
+_logger = logging.getLogger(__name__)
+
+# name of the function of the script that processes a batch
+HANDLER = "handle"
+
+
+def _read_batches(stream, batch_size):
+    """Yield (line number, list of lines) tuples, skipping blank lines."""
+    lines = (
+        (lineno, line) for lineno, line in enumerate(stream, start=1) if line.strip()
+    )
+    while True:
+        batch = list(itertools.islice(lines, batch_size))
+        if not batch:
+            return
+        yield batch[0][0], [line for _, line in batch]
+
+
+def run(env, handler, input, output, errors, batch_size=100, rollback=False):
+    """Call ``handler(env, records)`` on batches of JSON lines read from ``input``.
+
+    Each batch is processed in a savepoint, and committed unless
+    ``rollback`` is set. The values returned by the handler, if any, are
+    written to ``output`` as JSON lines. When a batch fails, the savepoint is
+    rolled back and the error is written to ``errors`` as a JSON line.
+    The ORM cache is cleared after each batch, so memory use does not grow
+    with the number of lines.
+
+    Return the number of failed batches.
+    """
+    failed = 0
+    for lineno, lines in _read_batches(input, batch_size):
+        try:
+            records = [json.loads(line) for line in lines]
+            with env.cr.savepoint():
+                results = list(handler(env, records) or [])
+        except Exception as e:
+            failed += 1
+            _logger.error("batch at line %s failed: %s", lineno, e)
+            error = {
+                "line": lineno,
+                "count": len(lines),
+                "error": str(e),
+                "traceback": traceback.format_exc(),
+            }
+            errors.write(json.dumps(error) + "\n")
+            errors.flush()
+            invalidate_all(env)
+            continue
+        if rollback:
+            flush_all(env)
+        else:
+            env.cr.commit()
+        # results are written once the batch is committed
+        for result in results:
+            output.write(json.dumps(result, default=str) + "\n")
+        output.flush()
+        invalidate_all(env)
+        memory.safe_point(env)
+    return failed
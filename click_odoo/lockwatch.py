@@ -0,0 +1,166 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Diagnostics of the lock waits of a cursor, sampled from another connection."""
+
+import logging
+import sys
+import threading
+from contextlib import closing, contextmanager
+
+_logger = logging.getLogger(__name__)
+
+_WAITING = """
+    SELECT
+        pg_blocking_pids(a.pid),
+        extract(epoch FROM now() - a.query_start),
+        a.query
+    FROM pg_stat_activity a
+    WHERE a.pid = %s
+"""
+
+_AWAITED_LOCKS = """
+    SELECT l.locktype, l.relation::regclass::text, l.transactionid::text, l.mode
+    FROM pg_locks l
+    WHERE l.pid = %s AND NOT l.granted
+"""
+
+_BLOCKERS = """
+    SELECT
+        a.pid,
+        a.usename,
+        a.application_name,
+        a.state,
+        extract(epoch FROM now() - a.xact_start),
+        a.query
+    FROM pg_stat_activity a
+    WHERE a.pid = ANY(%s)
+    ORDER BY a.xact_start
+"""
+
+
+def _connect(database):
+    """Return a new connection to the database, outside of the Odoo pool."""
+    import psycopg2
+
+    from .compat import odoo
+
+    _, info = odoo.sql_db.connection_info_for(database)
+    cnx = psycopg2.connect(**info)
+    cnx.autocommit = True
+    return cnx
+
+
+def _describe_lock(locktype, relation, transactionid, mode):
+    if relation:
+        return "{} on {}".format(mode, relation)
+    if transactionid:
+        return "{} on transaction {}".format(mode, transactionid)
+    return "{} on {}".format(mode, locktype)
+
+
+class LockWatcher:
+    """Thread sampling the lock waits of the backend ``pid`` every ``interval``.
+
+    The total lock-wait time is estimated from the samples, so waits shorter
+    than the interval may be missed.
+    """
+
+    def __init__(self, database, pid, interval=1.0, stream=None, query_width=200):
+        self.database = database
+        self.pid = pid
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.query_width = query_width
+        self.waits = 0
+        self.wait_time = 0.0
+        self._waiting = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._watch, name="click-odoo-lockwatch", daemon=True
+        )
+
+    def _watch(self):
+        try:
+            with closing(_connect(self.database)) as cnx:
+                with closing(cnx.cursor()) as cr:
+                    while not self._stop.wait(self.interval):
+                        self._sample(cr)
+        except Exception as e:
+            _logger.warning("Lock watch stopped: %s", e)
+
+    def _sample(self, cr):
+        cr.execute(_WAITING, (self.pid,))
+        row = cr.fetchone()
+        blocking_pids = row[0] if row else None
+        if not blocking_pids:
+            self._waiting = False
+            return
+        if not self._waiting:
+            self.waits += 1
+            self._waiting = True
+        self.wait_time += self.interval
+        cr.execute(_AWAITED_LOCKS, (self.pid,))
+        locks = ", ".join(_describe_lock(*lock) for lock in cr.fetchall())
+        cr.execute(_BLOCKERS, (blocking_pids,))
+        blockers = []
+        for pid, user, application, state, xact_age, query in cr.fetchall():
+            blockers.append(
+                "  pid {} ({}, {}, {}, transaction started {:.1f}s ago): {}".format(
+                    pid,
+                    user,
+                    application or "-",
+                    state,
+                    xact_age or 0,
+                    self._shorten(query),
+                )
+            )
+        _logger.warning(
+            "Backend %s waits for %s, in a query running for %.1fs: %s\n"
+            "blocked by:\n%s",
+            self.pid,
+            locks or "a lock",
+            row[1] or 0,
+            self._shorten(row[2]),
+            "\n".join(blockers),
+        )
+
+    def _shorten(self, query):
+        query = " ".join((query or "").split())
+        if len(query) > self.query_width:
+            query = query[: self.query_width - 3] + "..."
+        return query
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self):
+        self.stream.write(
+            "lock waits: {} waits, about {:.1f}s in total (sampled every {}s)\n".format(
+                self.waits, self.wait_time, self.interval
+            )
+        )
+
+
+def watch_hook(database, interval=1.0):
+    """Return a cursor hook that watches the lock waits of the cursor.
+
+    ``database`` is the database, or the DSN, the cursor is connected to.
+    A summary of the lock waits is written on stderr when the cursor
+    is released.
+    """
+
+    @contextmanager
+    def hook(cr):
+        watcher = LockWatcher(database, cr._cnx.get_backend_pid(), interval)
+        watcher.start()
+        try:
+            yield
+        finally:
+            watcher.stop()
+            watcher.report()
+
+    return hook
@@ -0,0 +1,224 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Memory limits of script runs.
+
+While ``govern()`` is active, a thread watches the resident set size of the
+process. Above the soft limit, the ORM cache is cleared at the next safe
+point: after a commit of the environment cursor, between pages of
+``iter_pages()``, or when the script calls ``safe_point(env)``. Above the
+hard limit, the main thread is interrupted, so the transaction is rolled
+back, and the top allocations recorded by tracemalloc are reported.
+"""
+
+import _thread
+import ctypes
+import gc
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+_logger = logging.getLogger(__name__)
+
+_current = None
+
+# seconds between two measures of the resident set size
+POLL_INTERVAL = 1.0
+# fraction of the hard limit above which allocations are traced, to report
+# them if the hard limit is exceeded
+TRACE_FRACTION = 0.8
+# number of allocation sites reported when the hard limit is exceeded
+TOP_ALLOCATIONS = 15
+
+MB = 1024 * 1024
+
+
+class MemoryLimitExceeded(Exception):
+    pass
+
+
+def rss():
+    """Return the resident set size of the current process, in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def peak_rss():
+    """Return the peak resident set size of the current process, in bytes."""
+    import resource
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        # in bytes on macOS
+        return maxrss
+    # in kilobytes on Linux and the BSDs
+    return maxrss * 1024
+
+
+def _malloc_trim():
+    # return the memory freed by the cache to the system, so rss decreases
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class MemoryGovernor:
+    def __init__(self, soft_limit=None, hard_limit=None, stream=None):
+        # limits in megabytes
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.stream = stream or sys.stderr
+        self.trim_requested = False
+        self.exceeded = False
+        self.peak = 0
+        self._started_tracemalloc = False
+        self._stop = threading.Event()
+        # so the main thread is not interrupted once the block is done
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._watch, name="click-odoo-memory", daemon=True
+        )
+
+    def _should_trace(self, current):
+        # the allocations are only reported when the hard limit is exceeded
+        if not self.hard_limit or tracemalloc.is_tracing():
+            return False
+        return current > self.hard_limit * TRACE_FRACTION * MB
+
+    def _watch(self):
+        while not self._stop.wait(POLL_INTERVAL):
+            current = rss()
+            self.peak = max(self.peak, current)
+            if self._should_trace(current):
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            if self.hard_limit and current > self.hard_limit * MB:
+                with self._lock:
+                    if self._stopped:
+                        return
+                    self.exceeded = True
+                    self._report_allocations(current)
+                    _thread.interrupt_main()
+                return
+            if self.soft_limit and current > self.soft_limit * MB:
+                self.trim_requested = True
+
+    def _report_allocations(self, current):
+        self.stream.write(
+            "RSS {:.0f}MB exceeds the hard memory limit of {}MB.\n".format(
+                current / MB, self.hard_limit
+            )
+        )
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+        stats = snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        if not stats:
+            # tracing started when the hard limit was already exceeded
+            return
+        self.stream.write("top allocations since tracing started:\n")
+        for stat in stats:
+            self.stream.write("  {}\n".format(stat))
+
+    def trim(self, env):
+        """Clear the ORM cache if the soft limit is exceeded."""
+        from .compat import flush_all, invalidate_all
+
+        if not self.trim_requested:
+            return
+        self.trim_requested = False
+        before = rss()
+        flush_all(env)
+        invalidate_all(env)
+        gc.collect()
+        _malloc_trim()
+        _logger.info(
+            "Soft memory limit exceeded, ORM cache cleared: RSS %.0fMB -> %.0fMB.",
+            before / MB,
+            rss() / MB,
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+        self._stop.set()
+        self._thread.join()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        self.peak = max(self.peak, rss(), peak_rss())
+
+    def report(self):
+        self.stream.write("peak RSS: {:.0f}MB\n".format(self.peak / MB))
+
+
+@contextmanager
+def govern(soft_limit=None, hard_limit=None):
+    """Enforce memory limits, in megabytes, while the block runs.
+
+    Raise ``MemoryLimitExceeded`` if the hard limit is exceeded.
+    """
+    global _current
+    governor = MemoryGovernor(soft_limit, hard_limit)
+    _current = governor
+    governor.start()
+    try:
+        yield governor
+    except KeyboardInterrupt:
+        if governor.exceeded:
+            raise MemoryLimitExceeded(
+                "Hard memory limit of {}MB exceeded.".format(hard_limit)
+            )
+        raise
+    finally:
+        governor.stop()
+        _current = None
+        governor.report()
+
+
+def safe_point(env):
+    """Clear the ORM cache of ``env`` if the soft memory limit is exceeded.
+
+    Call this where no record values need to be kept in cache, e.g.
+    between batches of records.
+    """
+    if _current is not None:
+        _current.trim(env)
+
+
+@contextmanager
+def cursor_hook(cr):
+    """Cursor hook that clears the ORM cache after commits, if needed."""
+    commit = cr.commit
+    overridden = "commit" in vars(cr)
+
+    def governed_commit():
+        result = commit()
+        if _current is not None and _current.trim_requested:
+            from .compat import Environment, odoo
+
+            _current.trim(Environment(cr, odoo.SUPERUSER_ID, {}))
+        return result
+
+    cr.commit = governed_commit
+    try:
+        yield
+    finally:
+        if overridden:
+            cr.commit = commit
+        else:
+            del cr.commit
@@ -0,0 +1,173 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+import datetime
+import fnmatch
+import io
+import json
+import logging
+import multiprocessing
+import re
+import sys
+import time
+
+import click
+
+from . import console
+
+_logger = logging.getLogger(__name__)
+
+_GLOB_CHARS = "*?["
+
+# set in forked workers by _init_worker
+_invoke_database = None
+
+
+def list_databases():
+    """Return the databases Odoo can see, honoring the dbfilter option."""
+    from .compat import odoo
+
+    databases = odoo.service.db.list_dbs(True)
+    dbfilter = odoo.tools.config["dbfilter"]
+    if dbfilter:
+        if "%h" in dbfilter or "%d" in dbfilter:
+            _logger.warning(
+                "Ignoring dbfilter %r which depends on the http host.", dbfilter
+            )
+        else:
+            databases = [db for db in databases if re.match(dbfilter, db)]
+    return sorted(databases)
+
+
+def expand_databases(database, all_databases):
+    """Expand a comma separated list of database names or glob patterns.
+
+    Return None when ``database`` designates a single database.
+    """
+    if all_databases:
+        return list_databases()
+    if not is_multi_database(database):
+        return None
+    available = None
+    databases = []
+    for name in database.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if _is_glob(name):
+            if available is None:
+                available = list_databases()
+            matches = fnmatch.filter(available, name)
+        else:
+            matches = [name]
+        for match in matches:
+            if match not in databases:
+                databases.append(match)
+    return databases
+
+
+def is_multi_database(database):
+    """Tell if ``database`` is a list of names or a glob pattern."""
+    return bool(database) and ("," in database or _is_glob(database))
+
+
+def _is_glob(name):
+    return any(c in name for c in _GLOB_CHARS)
+
+
+def _init_worker(invoke_database, stdin_source):
+    global _invoke_database
+    _invoke_database = invoke_database
+    if stdin_source is not None:
+        # multiprocessing redirects stdin to /dev/null in workers
+        sys.stdin = io.StringIO(stdin_source)
+
+
+def _run_database(database):
+    result = {
+        "database": database,
+        "status": "ok",
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "elapsed": None,
+        "error": None,
+    }
+    start = time.time()
+    try:
+        _invoke_database(database)
+    except click.exceptions.Exit as e:
+        if e.exit_code:
+            result["status"] = "failed"
+            result["error"] = "exit code {}".format(e.exit_code)
+    except SystemExit as e:
+        if e.code:
+            result["status"] = "failed"
+            result["error"] = "exit code {}".format(e.code)
+    except Exception as e:
+        _logger.error("exception in database %s", database, exc_info=True)
+        result["status"] = "failed"
+        result["error"] = str(e)
+    result["elapsed"] = round(time.time() - start, 3)
+    return result
+
+
+def run_databases(invoke_database, databases, jobs=1, results_file=None):
+    """Call ``invoke_database(database)`` for each database.
+
+    Each call runs in a fresh forked process, at most ``jobs`` at a time.
+    A summary is printed on stderr and the results are optionally
+    appended as json lines to ``results_file``.
+    Return the list of results.
+    """
+    from .compat import odoo
+
+    stdin_source = None
+    if not console._isatty(sys.stdin):
+        # read once and replay to each database
+        stdin_source = sys.stdin.read()
+    # forked workers must not share the connections of the parent
+    odoo.sql_db.close_all()
+    results = []
+    pool = multiprocessing.get_context("fork").Pool(
+        processes=min(jobs, len(databases)),
+        initializer=_init_worker,
+        initargs=(invoke_database, stdin_source),
+        maxtasksperchild=1,
+    )
+    try:
+        out = open(results_file, "a") if results_file else None
+        try:
+            for result in pool.imap_unordered(_run_database, databases):
+                click.echo(
+                    "{database}: {status} in {elapsed:.2f}s".format(**result),
+                    err=True,
+                )
+                results.append(result)
+                if out:
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+        finally:
+            if out:
+                out.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    _print_summary(results)
+    return results
+
+
+def _print_summary(results):
+    width = max(len("database"), *(len(r["database"]) for r in results))
+    click.echo("", err=True)
+    click.echo(
+        "{:<{width}}  {:<6}  {:>9}".format(
+            "database", "status", "elapsed", width=width
+        ),
+        err=True,
+    )
+    for result in sorted(results, key=lambda r: r["database"]):
+        click.echo(
+            "{:<{width}}  {:<6}  {:>8.2f}s".format(
+                result["database"], result["status"], result["elapsed"], width=width
+            ),
+            err=True,
+        )
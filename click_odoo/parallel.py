@@ -0,0 +1,120 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+import collections
+import logging
+import math
+import multiprocessing
+import os
+import traceback
+
+from .env import OdooEnvironment
+
+_logger = logging.getLogger(__name__)
+
+ShardResult = collections.namedtuple(
+    "ShardResult", ["index", "total", "processed", "pending_ids", "error"]
+)
+
+# set in forked workers by _init_worker
+_job = None
+# connection pools inherited from the parent, kept referenced so
+# they are never garbage collected (and closed) in the workers
+_parent_pools = []
+
+
+def _init_worker(job):
+    global _job
+    from .compat import odoo
+
+    _job = job
+    # connections inherited from the parent belong to the parent
+    for name in ("_Pool", "_Pool_readonly"):
+        pool = getattr(odoo.sql_db, name, None)
+        if pool is not None:
+            _parent_pools.append(pool)
+            setattr(odoo.sql_db, name, None)
+    # the registry takes its cursors from the pool it was loaded with, and
+    # the parent cannot close its pool before forking, as its cursor is open
+    database = job[0]
+    registry = odoo.modules.registry.Registry(database)
+    registry._db = odoo.sql_db.db_connect(database)
+    if getattr(registry, "_db_readonly", None) is not None:
+        # Odoo >= 18, with a read only replica
+        registry._db_readonly = odoo.sql_db.db_connect(database, readonly=True)
+
+
+def _run_shard(shard):
+    index, ids = shard
+    database, model, uid, context, callback, chunk_size = _job
+    processed = 0
+    with OdooEnvironment(database=database, keep_registry=True) as base_env:
+        env = base_env(user=uid, context=context)
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i : i + chunk_size]
+            try:
+                callback(env[model].browse(chunk))
+                env.cr.commit()
+            except Exception:
+                env.cr.rollback()
+                _logger.error("shard %s of %s failed", index, model, exc_info=True)
+                return ShardResult(
+                    index, len(ids), processed, ids[i:], traceback.format_exc()
+                )
+            processed += len(chunk)
+    return ShardResult(index, len(ids), processed, [], None)
+
+
+def run_sharded(
+    env,
+    model,
+    domain,
+    callback,
+    processes=None,
+    shard_size=None,
+    chunk_size=100,
+    progress=None,
+):
+    """Call ``callback(records)`` on the records matching ``domain``, in parallel.
+
+    The ids of the matching records are split in shards that are processed
+    by ``processes`` forked worker processes (default: the number of CPUs).
+    Workers are forked with the registry loaded, so it is shared with the
+    parent. Each shard is processed in its own environment, by chunks of
+    ``chunk_size`` records, committing after each chunk. When a chunk fails,
+    it is rolled back and the rest of the shard is skipped.
+
+    Workers only see data committed by the parent. ``progress(result)``
+    is called in the parent each time a shard is done.
+
+    Return the list of ``ShardResult``, in shard order.
+    """
+    ids = env[model].search(domain, order="id").ids
+    if not ids:
+        return []
+    processes = processes or os.cpu_count() or 1
+    if not shard_size:
+        # a few shards per process, to balance the load
+        shard_size = max(chunk_size, math.ceil(len(ids) / (processes * 4)))
+    shards = list(
+        enumerate(ids[i : i + shard_size] for i in range(0, len(ids), shard_size))
+    )
+    job = (env.cr.dbname, model, env.uid, dict(env.context), callback, chunk_size)
+    results = []
+    with multiprocessing.get_context("fork").Pool(
+        processes=min(processes, len(shards)),
+        initializer=_init_worker,
+        initargs=(job,),
+    ) as pool:
+        for result in pool.imap_unordered(_run_shard, shards):
+            if result.error:
+                _logger.error(
+                    "shard %s: %s of %s records processed",
+                    result.index,
+                    result.processed,
+                    result.total,
+                )
+            if progress:
+                progress(result)
+            results.append(result)
+    return sorted(results)
@@ -0,0 +1,92 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+import collections
+import cProfile
+import os
+import pstats
+import sys
+from contextlib import contextmanager
+
+# number of functions in the summary printed on stderr
+TOP = 25
+# deepest stack written to the collapsed stacks file
+MAX_DEPTH = 128
+# stacks below this fraction of the total time are not written
+MIN_FRACTION = 0.0001
+
+
+@contextmanager
+def profile(path, top=TOP):
+    """Profile the enclosed block.
+
+    The statistics are written to ``path`` in pstats format, and as
+    collapsed stacks, which flame graph tools read directly, to
+    ``path.collapsed``. The ``top`` functions by cumulative time are
+    printed on stderr.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        write_collapsed(stats, path + ".collapsed")
+        stats.sort_stats("cumulative").print_stats(top)
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        # built-in function
+        return name
+    return "{} ({}:{})".format(name, os.path.basename(filename), line)
+
+
+def write_collapsed(stats, path):
+    """Write the collapsed stacks of pstats ``stats`` to ``path``.
+
+    cProfile only records caller/callee pairs, so stacks are reconstructed
+    from the call graph, splitting the time of functions that have several
+    callers in proportion of the time spent under each caller. Time is
+    written in microseconds.
+    """
+    callees = collections.defaultdict(dict)
+    roots = []
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.stats.items():
+        if not callers or set(callers) == {func}:
+            # a recursive function only called by itself is a root too
+            roots.append(func)
+        for caller, edge in callers.items():
+            # edge is (cc, nc, tt, ct) of func when called by caller
+            callees[caller][func] = edge[3]
+    total = sum(stats.stats[root][3] for root in roots)
+    min_time = total * MIN_FRACTION
+    samples = collections.Counter()
+
+    def visit(func, stack, path, fraction):
+        _cc, _nc, tt, ct, _callers = stats.stats[func]
+        stack = stack + (_label(func),)
+        if tt * fraction > 0:
+            samples[";".join(stack)] += tt * fraction
+        if len(stack) >= MAX_DEPTH:
+            return
+        path = path | {func}
+        for callee, edge_ct in callees[func].items():
+            callee_ct = stats.stats[callee][3]
+            if callee in path or callee_ct <= 0:
+                continue
+            callee_fraction = fraction * edge_ct / callee_ct
+            if callee_ct * callee_fraction < min_time:
+                continue
+            visit(callee, stack, path, callee_fraction)
+
+    for root in roots:
+        visit(root, (), frozenset(), 1.0)
+    with open(path, "w") as f:
+        for stack, seconds in sorted(samples.items()):
+            microseconds = int(seconds * 1000000)
+            if microseconds:
+                f.write("{} {}\n".format(stack, microseconds))
@@ -0,0 +1,232 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""pytest fixtures for testing click-odoo scripts.
+
+``odoo_db`` is a database with the modules under test installed. It is
+cloned, with ``CREATE DATABASE ... TEMPLATE``, from a template database that
+is built once for the Odoo version and the modules to install, and reused by
+the next test sessions. With pytest-xdist, each worker has its own clone.
+
+``odoo_env`` is an environment on ``odoo_db`` in a transaction that is rolled
+back at the end of each test.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+from contextlib import closing, contextmanager
+
+import pytest
+
+from .env import OdooEnvironment
+
+TEMPLATE_PREFIX = "click-odoo-template-"
+SAVEPOINT = "click_odoo_test"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("click-odoo")
+    group.addoption(
+        "--click-odoo-config",
+        help="Odoo configuration file of the test databases.",
+    )
+    group.addoption(
+        "--click-odoo-modules",
+        help="Comma separated list of modules to install in the test databases "
+        "(default: base).",
+    )
+    group.addoption(
+        "--click-odoo-rebuild-template",
+        action="store_true",
+        help="Build the template database again, even if it exists.",
+    )
+    group.addoption(
+        "--click-odoo-keep-db",
+        action="store_true",
+        help="Do not drop the test databases at the end of the session.",
+    )
+    parser.addini("click_odoo_config", "Odoo configuration file.")
+    parser.addini("click_odoo_modules", "Modules to install.", default="base")
+
+
+def _get_option(config, name):
+    value = config.getoption("--click-odoo-" + name)
+    return value or config.getini("click_odoo_" + name)
+
+
+@contextmanager
+def _postgres_cursor():
+    """A cursor on the postgres database, in autocommit mode."""
+    from .compat import odoo
+
+    with closing(odoo.sql_db.db_connect("postgres").cursor()) as cr:
+        cr._cnx.autocommit = True
+        yield cr._obj
+
+
+@contextmanager
+def _lock(cr, name):
+    """Serialize the creation of test databases among pytest-xdist workers."""
+    cr.execute("SELECT pg_advisory_lock(hashtext(%s))", (name,))
+    try:
+        yield
+    finally:
+        cr.execute("SELECT pg_advisory_unlock(hashtext(%s))", (name,))
+
+
+def _db_exists(cr, dbname):
+    cr.execute("SELECT 1 FROM pg_database WHERE datname = %s", (dbname,))
+    return bool(cr.fetchone())
+
+
+def _drop_db(cr, dbname):
+    cr.execute('DROP DATABASE IF EXISTS "{}"'.format(dbname))
+
+
+def _template_name(modules):
+    """Name of the template database for the Odoo version and modules.
+
+    The manifests of the modules are part of the hash, so the template
+    is built again when their version or dependencies change.
+    """
+    from .compat import odoo
+
+    manifests = {}
+    for module in modules:
+        path = odoo.modules.module.get_module_path(module)
+        for manifest in ("__manifest__.py", "__openerp__.py"):
+            if path and os.path.exists(os.path.join(path, manifest)):
+                with open(os.path.join(path, manifest)) as f:
+                    manifests[module] = f.read()
+                break
+    key = json.dumps([odoo.release.version, modules, manifests], sort_keys=True)
+    return "{}{}-{}".format(
+        TEMPLATE_PREFIX,
+        odoo.release.version.replace(".", "-"),
+        hashlib.sha1(key.encode("utf-8")).hexdigest()[:10],
+    )
+
+
+def _build_template(cr, template, modules, odoo_config):
+    from .compat import odoo_bin
+
+    tmp_template = template + "-tmp"
+    _drop_db(cr, tmp_template)
+    cr.execute('CREATE DATABASE "{}"'.format(tmp_template))
+    cmd = [odoo_bin, "-d", tmp_template, "-i", ",".join(modules), "--stop-after-init"]
+    if odoo_config:
+        cmd.extend(["-c", odoo_config])
+    try:
+        subprocess.check_call(cmd)
+    except Exception:
+        _drop_db(cr, tmp_template)
+        raise
+    # renamed when complete, so interrupted builds are never used
+    cr.execute('ALTER DATABASE "{}" RENAME TO "{}"'.format(tmp_template, template))
+
+
+@pytest.fixture(scope="session")
+def odoo_template_db(request):
+    """Name of the template database, built if it does not exist."""
+    from .compat import odoo, odoo_version_info
+
+    odoo_config = _get_option(request.config, "config")
+    modules = sorted(
+        m.strip() for m in _get_option(request.config, "modules").split(",") if m
+    )
+    odoo_args = ["-c", odoo_config] if odoo_config else []
+    if odoo_version_info >= (18, 0):
+        odoo.tools.config.parse_config(odoo_args, setup_logging=False)
+    else:
+        odoo.tools.config.parse_config(odoo_args)
+    template = _template_name(modules)
+    with _postgres_cursor() as cr, _lock(cr, template):
+        if request.config.getoption("--click-odoo-rebuild-template"):
+            _drop_db(cr, template)
+        if not _db_exists(cr, template):
+            _build_template(cr, template, modules, odoo_config)
+    return template
+
+
+@pytest.fixture(scope="session")
+def odoo_db(request, odoo_template_db):
+    """Name of a database cloned from the template, one per xdist worker."""
+    from .compat import odoo
+
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    dbname = "{}-{}".format(odoo_template_db, worker)
+    with _postgres_cursor() as cr, _lock(cr, odoo_template_db):
+        _drop_db(cr, dbname)
+        cr.execute(
+            'CREATE DATABASE "{}" TEMPLATE "{}"'.format(dbname, odoo_template_db)
+        )
+    yield dbname
+    odoo.modules.registry.Registry.delete(dbname)
+    odoo.sql_db.close_db(dbname)
+    if not request.config.getoption("--click-odoo-keep-db"):
+        with _postgres_cursor() as cr:
+            _drop_db(cr, dbname)
+
+
+@contextmanager
+def _test_cursor(cr):
+    """Cursor hook that keeps all the work of a test in one transaction.
+
+    Commits create a savepoint that rollbacks return to, so the code under
+    test can commit and rollback as usual. Like ``odoo.sql_db.TestCursor``,
+    commits run the precommit callbacks but not the postcommit ones, and
+    rollbacks run the rollback callbacks. The transaction is rolled back at
+    the end.
+    """
+    from .compat import Environment, flush_all, invalidate_all, odoo
+
+    # the callbacks of the transaction, Odoo >= 14
+    callbacks = hasattr(cr, "precommit")
+
+    def env():
+        return Environment(cr, odoo.SUPERUSER_ID, {})
+
+    def commit():
+        flush_all(env())
+        if callbacks:
+            cr.precommit.run()
+            flush_all(env())
+        cr.execute("RELEASE SAVEPOINT " + SAVEPOINT)
+        cr.execute("SAVEPOINT " + SAVEPOINT)
+        invalidate_all(env())
+        if callbacks:
+            cr.precommit.clear()
+            cr.prerollback.clear()
+            cr.postrollback.clear()
+            cr.postcommit.clear()
+
+    def rollback():
+        invalidate_all(env())
+        if callbacks:
+            cr.precommit.clear()
+            cr.postcommit.clear()
+            cr.prerollback.run()
+        cr.execute("ROLLBACK TO SAVEPOINT " + SAVEPOINT)
+        if callbacks:
+            cr.postrollback.run()
+
+    cr.execute("SAVEPOINT " + SAVEPOINT)
+    cr.commit, cr.rollback = commit, rollback
+    try:
+        yield
+    finally:
+        del cr.commit, cr.rollback
+        cr.rollback()
+
+
+@pytest.fixture
+def odoo_env(odoo_db):
+    """An environment on ``odoo_db``, rolled back at the end of the test."""
+    with OdooEnvironment(
+        database=odoo_db,
+        rollback=True,
+        keep_registry=True,
+        cursor_hooks=[_test_cursor],
+    ) as env:
+        yield env
@@ -0,0 +1,77 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+from . import memory
+from .compat import flush_all, invalidate_all
+
+
+def iter_pages(
+    env,
+    model,
+    domain=None,
+    page_size=1000,
+    commit_every=None,
+    start_after=0,
+    checkpoint=None,
+):
+    """Iterate over the records of ``model`` matching ``domain``, by pages.
+
+    Records are read in ``id`` order, ``page_size`` at a time, each page
+    being searched for with ``id > last id of the previous page``. Only the
+    ids of the current page are held in memory, and fields are prefetched
+    for the current page only. Before the next page is read, pending updates
+    are flushed and the ORM cache is cleared, so the memory used does not
+    grow with the number of records. Records of previous pages must
+    therefore not be kept by the caller.
+
+    When ``commit_every`` is set, the transaction is committed every
+    ``commit_every`` pages. ``start_after`` is the id after which to start,
+    to resume an interrupted iteration.
+
+    With a ``Checkpoint``, the iteration starts after its watermark, and the
+    last id processed is committed with the work done (by default after
+    each page). The checkpoint is removed once all the records are processed.
+    """
+    domain = list(domain or [])
+    last_id = start_after
+    if checkpoint:
+        if checkpoint.watermark is not None:
+            last_id = checkpoint.watermark
+        commit_every = commit_every or 1
+    pages = 0
+
+    def commit():
+        if checkpoint:
+            checkpoint.commit(last_id)
+        else:
+            env.cr.commit()
+
+    while True:
+        records = env[model].search(
+            domain + [("id", ">", last_id)], limit=page_size, order="id"
+        )
+        if not records:
+            break
+        yield records.with_prefetch()
+        last_id = records.ids[-1]
+        pages += 1
+        flush_all(env)
+        if commit_every and pages % commit_every == 0:
+            commit()
+        invalidate_all(env)
+        memory.safe_point(env)
+        if len(records) < page_size:
+            break
+    if commit_every and pages % commit_every:
+        commit()
+    if checkpoint:
+        checkpoint.done()
+
+
+def iter_records(env, model, domain=None, page_size=1000, **kwargs):
+    """Iterate over the records of ``model`` matching ``domain``, one by one.
+
+    This is ``iter_pages()``, one record at a time.
+    """
+    for records in iter_pages(env, model, domain, page_size, **kwargs):
+        yield from records
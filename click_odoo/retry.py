@@ -0,0 +1,71 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Retry of transactions that fail on serialization failures and deadlocks."""
+
+import logging
+import random
+import time
+
+_logger = logging.getLogger(__name__)
+
+# serialization_failure, deadlock_detected
+RETRYABLE_PGCODES = {"40001": "serialization failure", "40P01": "deadlock"}
+
+# maximum wait between attempts, in seconds
+MAX_DELAY = 30.0
+
+
+def retryable_pgcode(exc):
+    """Return the PostgreSQL error code of ``exc`` if it can be retried.
+
+    The exceptions ``exc`` was raised from are looked at too, as the
+    database error may have been wrapped. Return None if none can be retried.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        pgcode = getattr(exc, "pgcode", None)
+        if pgcode in RETRYABLE_PGCODES:
+            return pgcode
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def backoff(attempt, delay):
+    """Wait time before retrying ``attempt`` (starting at 1).
+
+    Exponential backoff with full jitter, so concurrent jobs that failed
+    together do not retry together.
+    """
+    return random.uniform(0, min(MAX_DELAY, delay * 2 ** (attempt - 1)))
+
+
+def run_with_retry(func, retries=3, delay=0.5):
+    """Call ``func()``, retrying on serialization failures and deadlocks.
+
+    ``func`` is called again up to ``retries`` times, waiting with
+    ``backoff`` between attempts. It must run its own transaction, and roll
+    it back when it fails, for instance with
+    ``OdooEnvironment(database, keep_registry=True)``, so the registry is not
+    loaded again at each attempt.
+    """
+    attempt = 1
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            pgcode = retryable_pgcode(e)
+            if pgcode is None or attempt > retries:
+                raise
+            wait = backoff(attempt, delay)
+            _logger.warning(
+                "Attempt %s of %s failed with a %s (%s), retrying in %.2fs: %s",
+                attempt,
+                retries + 1,
+                RETRYABLE_PGCODES[pgcode],
+                pgcode,
+                wait,
+                str(e).strip(),
+            )
+            time.sleep(wait)
+            attempt += 1
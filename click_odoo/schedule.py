@@ -0,0 +1,87 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Repetition of a command at a fixed interval, in the same process."""
+
+import logging
+import math
+import time
+
+import click
+
+_logger = logging.getLogger(__name__)
+
+
+class RunsFailed(Exception):
+    pass
+
+
+def check_registry(database):
+    """Reload the registry of ``database`` if another process changed it.
+
+    The caches of the registry are cleared too, if another process
+    invalidated them. Return the registry.
+    """
+    from .compat import odoo
+
+    return odoo.modules.registry.Registry(database).check_signaling()
+
+
+def run_every(func, interval, max_runs=None, before_run=None):
+    """Call ``func()`` every ``interval`` seconds, up to ``max_runs`` times.
+
+    Runs start at fixed times from the first one, so they do not drift with
+    the time they take. A run that takes longer than the interval is not
+    overlapped: the runs that should have started meanwhile are skipped.
+    ``before_run()`` is called before each run but the first. A failed run is
+    logged and does not stop the next ones, but ``RunsFailed`` is raised after
+    the last run if any failed. Usage errors and exits of the click command
+    are not failed runs, they stop the repetition, like an interruption while
+    waiting for the next run. Return the result of the last run.
+    """
+    result = None
+    runs = failures = 0
+    next_start = time.monotonic()
+    while True:
+        started = time.monotonic()
+        runs += 1
+        try:
+            if runs > 1 and before_run:
+                before_run()
+            result = func()
+        except (click.UsageError, click.exceptions.Exit):
+            # the command cannot run like this, or chose to stop
+            raise
+        except Exception as e:
+            failures += 1
+            _logger.error("Run %s failed: %s", runs, e, exc_info=True)
+            status = "failed"
+        else:
+            status = "done"
+        now = time.monotonic()
+        _logger.info(
+            "Run %s %s in %.2fs, started %.2fs late.",
+            runs,
+            status,
+            now - started,
+            started - next_start,
+        )
+        if max_runs and runs >= max_runs:
+            break
+        next_start += interval
+        if now > next_start:
+            skipped = int(math.ceil((now - next_start) / interval))
+            next_start += skipped * interval
+            _logger.warning(
+                "Run %s took longer than the interval of %ss, skipping %s run(s).",
+                runs,
+                interval,
+                skipped,
+            )
+        try:
+            time.sleep(max(0, next_start - time.monotonic()))
+        except KeyboardInterrupt:
+            _logger.info("Interrupted after %s run(s).", runs)
+            break
+    if failures:
+        raise RunsFailed("{} of {} runs failed.".format(failures, runs))
+    return result
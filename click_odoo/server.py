@@ -0,0 +1,403 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Warm registry server and its thin client.
+
+``click-odoo-server`` loads the registries of one or more databases once,
+then pre-forks workers that execute scripts sent by ``click-odoo-client``
+over a Unix socket. Messages are length-prefixed JSON documents.
+
+Odoo is only imported on the server side, so the client starts quickly.
+"""
+
+import io
+import json
+import logging
+import os
+import runpy
+import signal
+import socket
+import struct
+import sys
+import time
+import traceback
+
+import click
+
+from . import console, memory
+from .env_options import env_options
+
+_logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!I")
+
+# a worker that fails before running this long has crashed at startup
+MIN_WORKER_LIFETIME = 5
+# consecutive startup crashes after which the server stops
+MAX_STARTUP_CRASHES = 5
+
+
+def _send(sock, message):
+    data = json.dumps(message).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock):
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    data = _recv_exactly(sock, _HEADER.unpack(header)[0])
+    if data is None:
+        return None
+    return json.loads(data.decode("utf-8"))
+
+
+class _StreamProxy(io.TextIOBase):
+    """A text stream that forwards everything written to the client."""
+
+    encoding = "utf-8"
+
+    def __init__(self, sock, name):
+        super().__init__()
+        self._sock = sock
+        self._name = name
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return False
+
+    def write(self, s):
+        if s:
+            _send(self._sock, {"stream": self._name, "data": s})
+        return len(s)
+
+
+def _exit_code(e):
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+class Server:
+    def __init__(self, socket_path, databases, workers=2, max_requests=0, max_memory=0):
+        self.socket_path = socket_path
+        self.databases = databases
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_memory = max_memory
+        # pid: start time
+        self.worker_pids = {}
+        self.startup_crashes = 0
+
+    def run(self):
+        # imported here, so the client does not pay for it
+        from .compat import odoo
+
+        for database in self.databases:
+            _logger.info("Preloading registry of database %s", database)
+            odoo.modules.registry.Registry(database)
+        # workers must not share the connections opened while preloading
+        odoo.sql_db.close_all()
+        listener = self._listen()
+        signal.signal(signal.SIGTERM, self._stop)
+        try:
+            for _ in range(self.workers):
+                self._spawn(listener)
+            while True:
+                pid, status = os.wait()
+                if pid in self.worker_pids:
+                    started = self.worker_pids.pop(pid)
+                    self._check_startup_crash(status, time.monotonic() - started)
+                    self._spawn(listener)
+        except (SystemExit, KeyboardInterrupt):
+            _logger.info("Stopping click-odoo server")
+        finally:
+            for pid in self.worker_pids:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+            for pid in self.worker_pids:
+                try:
+                    os.waitpid(pid, 0)
+                except OSError:
+                    pass
+            listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def _check_startup_crash(self, status, lifetime):
+        """Wait before replacing a worker that crashed at startup.
+
+        The wait doubles with each consecutive crash, and the server stops
+        after ``MAX_STARTUP_CRASHES`` of them.
+        """
+        if status == 0 or lifetime >= MIN_WORKER_LIFETIME:
+            self.startup_crashes = 0
+            return
+        self.startup_crashes += 1
+        if self.startup_crashes >= MAX_STARTUP_CRASHES:
+            raise click.ClickException(
+                "{} workers crashed at startup in a row, stopping.".format(
+                    self.startup_crashes
+                )
+            )
+        delay = 2 ** (self.startup_crashes - 1)
+        _logger.warning(
+            "click-odoo worker crashed after %.1fs, replacing it in %ss.",
+            lifetime,
+            delay,
+        )
+        time.sleep(delay)
+
+    def _stop(self, signum, frame):
+        raise SystemExit(0)
+
+    def _listen(self):
+        # bind to a temporary path and rename it when ready, so clients
+        # never see a socket that is not listening yet
+        tmp_path = self.socket_path + ".tmp"
+        for path in (tmp_path, self.socket_path):
+            if os.path.exists(path):
+                os.unlink(path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(tmp_path)
+        os.chmod(tmp_path, 0o600)
+        listener.listen(64)
+        os.rename(tmp_path, self.socket_path)
+        _logger.info("click-odoo server listening on %s", self.socket_path)
+        return listener
+
+    def _spawn(self, listener):
+        pid = os.fork()
+        if pid:
+            self.worker_pids[pid] = time.monotonic()
+            return
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            self._work(listener)
+        except Exception:
+            _logger.exception("click-odoo worker %s crashed", os.getpid())
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _work(self, listener):
+        served = 0
+        while True:
+            conn, _ = listener.accept()
+            try:
+                self._serve(conn)
+            except OSError:
+                _logger.warning("Lost connection to client", exc_info=True)
+            finally:
+                conn.close()
+            served += 1
+            if self.max_requests and served >= self.max_requests:
+                _logger.info("Recycling worker %s after %s runs", os.getpid(), served)
+                return
+            if self.max_memory and memory.rss() > self.max_memory * 1024 * 1024:
+                _logger.info(
+                    "Recycling worker %s above %s MB", os.getpid(), self.max_memory
+                )
+                return
+
+    def _serve(self, conn):
+        request = _recv(conn)
+        if request is None:
+            return
+        database = request.get("database")
+        if not database and len(self.databases) == 1:
+            database = self.databases[0]
+        if database not in self.databases:
+            _send(
+                conn,
+                {
+                    "stream": "stderr",
+                    "data": "Database {!r} is not served, available databases: "
+                    "{}.\n".format(database, ", ".join(self.databases)),
+                },
+            )
+            _send(conn, {"exit": 2})
+            return
+        saved = (sys.stdin, sys.stdout, sys.stderr, sys.argv[:], os.getcwd())
+        sys.stdin = io.StringIO(request.get("stdin") or "")
+        sys.stdout = _StreamProxy(conn, "stdout")
+        sys.stderr = _StreamProxy(conn, "stderr")
+        exit_code = 0
+        try:
+            os.chdir(request.get("cwd") or saved[4])
+            self._execute(database, request)
+        except SystemExit as e:
+            exit_code = _exit_code(e)
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdin, sys.stdout, sys.stderr, sys.argv[:], cwd = saved
+            os.chdir(cwd)
+        _send(conn, {"exit": exit_code})
+
+    def _execute(self, database, request):
+        from .compat import odoo
+        from .env import OdooEnvironment
+
+        # pick up module updates made by other processes
+        odoo.modules.registry.Registry(database).check_signaling()
+        script = request.get("script")
+        with OdooEnvironment(
+            database=database, rollback=request.get("rollback"), keep_registry=True
+        ) as env:
+            global_vars = {"env": env}
+            if script:
+                sys.argv[1:] = request.get("argv") or []
+                runpy.run_path(script, init_globals=global_vars, run_name="__main__")
+            else:
+                sys.argv[:] = [""]
+                global_vars["__name__"] = "__main__"
+                exec(sys.stdin.read(), global_vars)
+
+
+@click.command(
+    help="Serve click-odoo scripts from workers that keep the registries "
+    "of the given databases loaded. Scripts are submitted with "
+    "click-odoo-client."
+)
+@env_options(with_database=False, with_rollback=False, with_addons_path=True)
+@click.option(
+    "--database",
+    "-d",
+    "databases",
+    multiple=True,
+    required=True,
+    help="Database to keep loaded. Can be repeated.",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    envvar="CLICK_ODOO_SOCKET",
+    required=True,
+    type=click.Path(dir_okay=False),
+    help="Path of the Unix socket to listen on.",
+)
+@click.option(
+    "--workers",
+    default=2,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of pre-forked workers.",
+)
+@click.option(
+    "--max-requests",
+    default=100,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="Recycle a worker after this number of runs (0 means never).",
+)
+@click.option(
+    "--max-memory",
+    default=0,
+    type=click.IntRange(min=0),
+    help="Recycle a worker when its resident memory exceeds this "
+    "number of megabytes (0 means never).",
+)
+def serve(env, databases, socket_path, workers, max_requests, max_memory):
+    Server(
+        socket_path,
+        list(databases),
+        workers=workers,
+        max_requests=max_requests,
+        max_memory=max_memory,
+    ).run()
+
+
+@click.command(
+    help="Execute a python script in a click-odoo-server worker. "
+    "The script has access to a 'env' global variable, exactly "
+    "as with click-odoo. If no script is provided, or if it is '-', it is "
+    "read from stdin."
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    envvar="CLICK_ODOO_SOCKET",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Path of the click-odoo-server Unix socket.",
+)
+@click.option(
+    "--database",
+    "-d",
+    envvar=["PGDATABASE"],
+    help="Specify the database name. It may be omitted when the "
+    "server serves a single database.",
+)
+@click.option(
+    "--rollback",
+    is_flag=True,
+    help="Rollback the transaction even if the script does not raise an exception.",
+)
+@click.argument(
+    "script",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False, allow_dash=True),
+)
+@click.argument("script-args", nargs=-1)
+def client(socket_path, database, rollback, script, script_args):
+    stdin = None
+    if script == "-":
+        script = None
+    if not script:
+        # stdin is only read for the script itself, as it may never be
+        # closed when the client runs from cron or a CI job
+        if console._isatty(sys.stdin):
+            raise click.UsageError(
+                "Interactive consoles are not supported by click-odoo-server, "
+                "please provide a script."
+            )
+        stdin = sys.stdin.read()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError as e:
+        raise click.ClickException(
+            "Could not connect to click-odoo server at {}: {}".format(socket_path, e)
+        )
+    with sock:
+        _send(
+            sock,
+            {
+                "database": database,
+                "rollback": rollback,
+                "script": os.path.abspath(script) if script else None,
+                "argv": list(script_args),
+                "stdin": stdin,
+                "cwd": os.getcwd(),
+            },
+        )
+        while True:
+            message = _recv(sock)
+            if message is None:
+                raise click.ClickException("Connection to click-odoo server lost.")
+            if "exit" in message:
+                sys.exit(message["exit"])
+            stream = sys.stdout if message["stream"] == "stdout" else sys.stderr
+            stream.write(message["data"])
+            stream.flush()
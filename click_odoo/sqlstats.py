@@ -0,0 +1,273 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""SQL query instrumentation of Odoo cursors."""
+
+import datetime
+import json
+import logging
+import re
+import time
+import traceback
+from contextlib import contextmanager
+
+_logger = logging.getLogger(__name__)
+
+_NORMALIZE = [
+    # string literals
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    # query parameters
+    (re.compile(r"%\(\w+\)s|%s"), "?"),
+    # numbers
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    # lists of values
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),
+    (re.compile(r"\s+"), " "),
+]
+
+# statements that EXPLAIN accepts
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|VALUES|INSERT|UPDATE|DELETE)\b", re.I)
+# statements that must not be executed again by EXPLAIN ANALYZE, because
+# they have effects that are not undone by rolling back to a savepoint,
+# or they take locks: sequences consumed by inserts, data-modifying WITH
+# queries, row locks, advisory locks and notifications
+_ANALYZE_UNSAFE = re.compile(
+    r"^\s*(INSERT|MERGE)\b"
+    r"|^\s*WITH\b[\s\S]*\b(INSERT|UPDATE|DELETE|MERGE)\b"
+    r"|\b(nextval|setval|pg_advisory\w*|pg_notify)\s*\("
+    r"|\bFOR\s+(NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(KEY\s+)?SHARE\b",
+    re.I,
+)
+
+
+def query_text(query):
+    """Return the text of a query passed to cursor.execute()."""
+    if hasattr(query, "code"):
+        # odoo.tools.SQL, Odoo >= 17
+        return query.code
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    return str(query)
+
+
+def query_params(query, params):
+    """Return the parameters of a query passed to cursor.execute()."""
+    if hasattr(query, "code"):
+        return query.params
+    return params
+
+
+def normalize(query):
+    """Return the query text, with parameters and literals replaced by ?."""
+    text = query_text(query)
+    for regex, replacement in _NORMALIZE:
+        text = regex.sub(replacement, text)
+    return text.strip()
+
+
+def instrument_cursor(cr, observer):
+    """Call ``observer(cr, query, params, elapsed)`` after each cr.execute().
+
+    Return a function that removes the instrumentation.
+    """
+    execute = cr.execute
+    overridden = "execute" in vars(cr)
+
+    def instrumented_execute(query, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return execute(query, params, *args, **kwargs)
+        finally:
+            observer(cr, query, params, time.perf_counter() - start)
+
+    cr.execute = instrumented_execute
+
+    def uninstrument():
+        if overridden:
+            cr.execute = execute
+        else:
+            del cr.execute
+
+    return uninstrument
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = {}
+
+    def record(self, cr, query, params, elapsed):
+        self.count += 1
+        self.duration += elapsed
+        statement = self.statements.setdefault(normalize(query), [0, 0.0])
+        statement[0] += 1
+        statement[1] += elapsed
+
+    def top(self, limit=None):
+        """Return (query, count, duration) tuples, by decreasing duration."""
+        statements = sorted(
+            ((query, s[0], s[1]) for query, s in self.statements.items()),
+            key=lambda s: s[2],
+            reverse=True,
+        )
+        return statements[:limit]
+
+    def as_dict(self, limit=None):
+        return {
+            "count": self.count,
+            "duration": self.duration,
+            "statements": [
+                {"query": query, "count": count, "duration": duration}
+                for query, count, duration in self.top(limit)
+            ],
+        }
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def report(self, stream, limit=20, width=160):
+        stream.write("SQL: {} queries in {:.3f}s\n".format(self.count, self.duration))
+        if not self.count:
+            return
+        stream.write("{:>7}  {:>9}  {:>9}  query\n".format("count", "total", "avg"))
+        for query, count, duration in self.top(limit):
+            if len(query) > width:
+                query = query[: width - 3] + "..."
+            stream.write(
+                "{:>7}  {:>8.3f}s  {:>7.2f}ms  {}\n".format(
+                    count, duration, duration / count * 1000, query
+                )
+            )
+
+
+def stats_hook(stream=None, path=None):
+    """Return a cursor hook that reports query statistics when done.
+
+    The statistics are printed to ``stream`` and written as json to ``path``.
+    """
+
+    @contextmanager
+    def hook(cr):
+        stats = QueryStats()
+        uninstrument = instrument_cursor(cr, stats.record)
+        try:
+            yield stats
+        finally:
+            uninstrument()
+            if stream:
+                stats.report(stream)
+            if path:
+                stats.dump(path)
+
+    return hook
+
+
+def analyze_safe(query):
+    """Return True if EXPLAIN ANALYZE can execute the query again."""
+    return not _ANALYZE_UNSAFE.search(query_text(query))
+
+
+def explain(cr, query, params=None, analyze=True):
+    """Return the plan of a query, in the transaction of cursor ``cr``.
+
+    With ``analyze``, the query is executed again with EXPLAIN (ANALYZE,
+    BUFFERS) in a savepoint that is rolled back, unless it is not safe to
+    do so, in which case a plain EXPLAIN is done. The query is run through a
+    separate cursor of the same connection, so the results of ``cr`` are
+    not lost. Return None if the query cannot be explained.
+    """
+    from psycopg2 import Error
+    from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+
+    text = query_text(query)
+    params = query_params(query, params)
+    cnx = cr._cnx
+    if not _EXPLAINABLE.match(text):
+        return None
+    if cnx.get_transaction_status() == TRANSACTION_STATUS_INERROR:
+        # the query failed and the transaction must be rolled back
+        return None
+    analyze = analyze and analyze_safe(text)
+    if cnx.autocommit:
+        # without transaction, nothing would be rolled back
+        analyze = False
+        savepoint = None
+    else:
+        # errors must not abort the transaction of the script
+        savepoint = "click_odoo_explain"
+    with cnx.cursor() as explain_cr:
+        if savepoint:
+            explain_cr.execute("SAVEPOINT " + savepoint)
+        try:
+            if analyze:
+                try:
+                    return _explain(explain_cr, "(ANALYZE, BUFFERS) ", text, params)
+                except Error as e:
+                    _logger.debug("EXPLAIN ANALYZE failed: %s", e)
+                    explain_cr.execute("ROLLBACK TO SAVEPOINT " + savepoint)
+            return _explain(explain_cr, "", text, params)
+        finally:
+            if savepoint:
+                explain_cr.execute("ROLLBACK TO SAVEPOINT " + savepoint)
+                explain_cr.execute("RELEASE SAVEPOINT " + savepoint)
+
+
+def _explain(cr, options, query, params):
+    cr.execute("EXPLAIN " + options + query, params)
+    return "\n".join(row[0] for row in cr.fetchall())
+
+
+def _caller_stack():
+    """Return the formatted stack, without the frames of this module."""
+    frames = [
+        frame for frame in traceback.extract_stack() if frame.filename != __file__
+    ]
+    return "".join(traceback.format_list(frames))
+
+
+def slow_query_hook(path, threshold, analyze=True):
+    """Return a cursor hook that logs the queries slower than ``threshold``.
+
+    Each query that takes ``threshold`` seconds or more is appended to the
+    file at ``path``, with its duration, the Python stack that executed it,
+    its parameters and its plan (see ``explain()``).
+    """
+
+    @contextmanager
+    def hook(cr):
+        def record(cr, query, params, elapsed):
+            if elapsed < threshold:
+                return
+            try:
+                plan = explain(cr, query, params, analyze=analyze)
+            except Exception as e:
+                _logger.warning("Could not explain slow query: %s", e)
+                plan = None
+            started_at = datetime.datetime.now(
+                datetime.timezone.utc
+            ) - datetime.timedelta(seconds=elapsed)
+            entry = [
+                "==== {:.3f}s on {} at {}".format(
+                    elapsed, cr.dbname, started_at.isoformat(timespec="seconds")
+                ),
+                "Stack (most recent call last):",
+                _caller_stack().rstrip("\n"),
+                "Query:",
+                query_text(query).strip(),
+                "Parameters: {!r}".format(query_params(query, params)),
+                "Plan:",
+                plan or "not available",
+                "",
+            ]
+            # one write per entry, files may be shared by several processes
+            with open(path, "a") as f:
+                f.write("\n".join(entry) + "\n")
+
+        uninstrument = instrument_cursor(cr, record)
+        try:
+            yield
+        finally:
+            uninstrument()
+
+    return hook
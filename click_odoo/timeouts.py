@@ -0,0 +1,143 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""PostgreSQL timeouts of the cursor, and deadline of the command."""
+
+import _thread
+import logging
+import sys
+import threading
+from contextlib import contextmanager
+
+_logger = logging.getLogger(__name__)
+
+# the Deadline of the running command, if any
+_current = None
+
+# time given to the main thread to stop by itself when the deadline
+# passes, before the queries it waits for are cancelled
+CANCEL_GRACE = 1.0
+
+SETTINGS = (
+    "statement_timeout",
+    "lock_timeout",
+    "idle_in_transaction_session_timeout",
+)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def settings_hook(**timeouts):
+    """Return a cursor hook that sets PostgreSQL timeouts, in seconds.
+
+    The keyword arguments are names of ``SETTINGS``. The settings are set
+    for the session of the cursor, so they remain after commits, and reset
+    when the cursor is released, as its connection goes back to the pool.
+    """
+    settings = {
+        name: "{}ms".format(int(value * 1000))
+        for name, value in timeouts.items()
+        if value
+    }
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise ValueError("Unsupported settings: {}.".format(", ".join(unknown)))
+
+    @contextmanager
+    def hook(cr):
+        for name, value in settings.items():
+            cr.execute("SELECT set_config(%s, %s, false)", (name, value))
+        # settings made in a transaction are undone by rolling it back
+        cr.commit()
+        try:
+            yield
+        finally:
+            cr.rollback()
+            for name in settings:
+                cr.execute("RESET {}".format(name))
+            cr.commit()
+
+    return hook
+
+
+class Deadline:
+    def __init__(self, seconds, stream=None):
+        self.seconds = seconds
+        self.stream = stream or sys.stderr
+        self.exceeded = False
+        self.cursors = []
+        self._done = threading.Event()
+        # so the main thread is not interrupted once the block is done
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._watch, name="click-odoo-deadline", daemon=True
+        )
+
+    def _watch(self):
+        if self._done.wait(self.seconds):
+            return
+        with self._lock:
+            if self._stopped:
+                return
+            self.exceeded = True
+            self.stream.write("Deadline of {}s exceeded.\n".format(self.seconds))
+            _thread.interrupt_main()
+        if self._done.wait(CANCEL_GRACE):
+            return
+        with self._lock:
+            if self._stopped:
+                return
+            # the main thread waits for the database
+            for cr in list(self.cursors):
+                try:
+                    cr._cnx.cancel()
+                except Exception as e:
+                    _logger.debug("Could not cancel the query: %s", e)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+        self._done.set()
+        self._thread.join()
+
+
+@contextmanager
+def deadline(seconds):
+    """Interrupt the block if it runs for more than ``seconds``.
+
+    The running query of the cursors registered with ``cursor_hook``
+    is cancelled, if needed. Raise ``DeadlineExceeded``.
+    """
+    global _current
+    watchdog = Deadline(seconds)
+    _current = watchdog
+    watchdog.start()
+    try:
+        yield watchdog
+    except BaseException as e:
+        # KeyboardInterrupt, or the error of the cancelled query
+        if watchdog.exceeded:
+            raise DeadlineExceeded("Deadline of {}s exceeded.".format(seconds)) from e
+        raise
+    finally:
+        watchdog.stop()
+        _current = None
+
+
+@contextmanager
+def cursor_hook(cr):
+    """Cursor hook that lets the deadline cancel the queries of ``cr``."""
+    watchdog = _current
+    if watchdog is None:
+        yield
+        return
+    watchdog.cursors.append(cr)
+    try:
+        yield
+    finally:
+        watchdog.cursors.remove(cr)
@@ -0,0 +1,162 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Wall clock and CPU time of the click-odoo startup phases.
+
+Recording is enabled by ``start()``, after which the ``phase()`` context
+manager records its duration. When recording is not enabled, ``phase()``
+does nothing.
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+_current = None
+
+_LOADING_LOGGER = "odoo.modules.loading"
+
+
+class Timings:
+    def __init__(self):
+        self.phases = []
+        self.modules = []
+
+    def add(self, name, wall, cpu):
+        self.phases.append({"phase": name, "wall": wall, "cpu": cpu})
+
+    @contextmanager
+    def phase(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def as_dict(self):
+        from .compat import odoo_version_info
+
+        return {
+            "odoo_version": ".".join(str(v) for v in odoo_version_info[:2]),
+            "phases": self.phases,
+            "modules": self.modules,
+            "total": {
+                "wall": sum(p["wall"] for p in self.phases),
+                "cpu": sum(p["cpu"] for p in self.phases),
+            },
+        }
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def report(self, stream, top_modules=10):
+        width = max([len("total")] + [len(p["phase"]) for p in self.phases])
+        line = "{:<{width}}  {:>9}  {:>9}\n"
+        stream.write(line.format("phase", "wall", "cpu", width=width))
+        for p in self.phases:
+            stream.write(
+                line.format(
+                    p["phase"],
+                    "{:.3f}s".format(p["wall"]),
+                    "{:.3f}s".format(p["cpu"]),
+                    width=width,
+                )
+            )
+        total = self.as_dict()["total"]
+        stream.write(
+            line.format(
+                "total",
+                "{:.3f}s".format(total["wall"]),
+                "{:.3f}s".format(total["cpu"]),
+                width=width,
+            )
+        )
+        if self.modules and top_modules:
+            stream.write("slowest modules to load:\n")
+            modules = sorted(self.modules, key=lambda m: m["wall"], reverse=True)
+            for m in modules[:top_modules]:
+                stream.write("  {:<40} {:>8.3f}s\n".format(m["module"], m["wall"]))
+
+
+class _ModuleLoadTimer(logging.Filter):
+    """Time module loading from the debug messages of odoo.modules.loading.
+
+    Messages that would not have been emitted without this filter are
+    dropped after being looked at.
+    """
+
+    def __init__(self, modules, level):
+        super().__init__()
+        self.modules = modules
+        self.level = level
+        self.current = None
+
+    def _close(self, created):
+        if self.current:
+            name, start = self.current
+            self.modules.append({"module": name, "wall": created - start})
+            self.current = None
+
+    def filter(self, record):
+        msg = str(record.msg)
+        if msg.startswith("Loading module "):
+            self._close(record.created)
+            self.current = (record.args[0], record.created)
+        elif "modules loaded in" in msg:
+            self._close(record.created)
+        return record.levelno >= self.level
+
+
+def start():
+    global _current
+    from . import compat
+
+    _current = Timings()
+    if compat.odoo_import_time:
+        # odoo was imported before recording started
+        _current.add("import odoo", *compat.odoo_import_time)
+    return _current
+
+
+def stop():
+    global _current
+    _current = None
+
+
+def dump(path):
+    if _current is not None:
+        _current.dump(path)
+
+
+def add(name, wall, cpu):
+    if _current is not None:
+        _current.add(name, wall, cpu)
+
+
+@contextmanager
+def phase(name):
+    if _current is None:
+        yield
+        return
+    with _current.phase(name):
+        yield
+
+
+@contextmanager
+def registry_phase():
+    """Record the registry loading phase, and the load time of each module."""
+    if _current is None:
+        yield
+        return
+    logger = logging.getLogger(_LOADING_LOGGER)
+    level = logger.level
+    module_timer = _ModuleLoadTimer(_current.modules, logger.getEffectiveLevel())
+    logger.addFilter(module_timer)
+    logger.setLevel(logging.DEBUG)
+    try:
+        with _current.phase("registry"):
+            yield
+    finally:
+        logger.setLevel(level)
+        logger.removeFilter(module_timer)
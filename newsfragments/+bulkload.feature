@@ -0,0 +1,2 @@
+Add ``click-odoo-bulkload``, to load large CSV files through a staging table,
+creating and updating records by batches with the ORM or set based SQL.
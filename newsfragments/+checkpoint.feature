@@ -0,0 +1,3 @@
+Add ``Checkpoint``, to commit the watermark of batch jobs with the work done,
+and resume them where they stopped. ``iter_pages`` and ``iter_records`` accept
+a checkpoint.
@@ -0,0 +1,2 @@
+Complete model names and record fields and methods in the interactive
+console, from an index of the registry that is cached on disk.
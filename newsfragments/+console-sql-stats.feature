@@ -0,0 +1,3 @@
+With ``--sql-stats``, the interactive console prints the number and duration
+of the SQL queries of each statement, and ``sqltrace()`` prints the queries of
+the previous statement.
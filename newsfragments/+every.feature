@@ -0,0 +1,2 @@
+Add ``--every``, to run a script at a fixed interval in the same process,
+reloading the registry only when another process changed it.
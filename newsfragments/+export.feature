@@ -0,0 +1,2 @@
+Add ``click-odoo-export``, to export records to CSV or JSON lines, streaming
+them from the database through a server side cursor.
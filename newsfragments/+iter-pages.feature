@@ -0,0 +1,2 @@
+Add ``iter_pages`` and ``iter_records``, to iterate over large tables by
+keyset paginated pages with bounded memory use.
@@ -0,0 +1,3 @@
+Add a ``--jsonl`` mode to ``click-odoo``, to process stdin as JSON lines by
+batches with a ``handle(env, records)`` function of the script, committing
+each batch and streaming the results to stdout.
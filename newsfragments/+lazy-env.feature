@@ -0,0 +1,3 @@
+Add a lazy environment, enabled with ``env_options(lazy_env=True)`` or the
+``--lazy-env`` option of ``click-odoo``, that loads the registry when ``env``
+is first used, so commands that exit early do not wait for it.
@@ -0,0 +1,2 @@
+Odoo is imported lazily, so ``--help``, shell completion and other commands
+that do not need Odoo start instantly.
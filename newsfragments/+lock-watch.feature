@@ -0,0 +1,2 @@
+Add ``--lock-watch``, to log the sessions that block the environment cursor
+while it waits for a lock, and report the total lock-wait time.
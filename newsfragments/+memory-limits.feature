@@ -0,0 +1,2 @@
+Add ``--soft-memory-limit`` and ``--hard-memory-limit`` options, to clear the
+ORM cache or abort the script when its memory use exceeds a limit.
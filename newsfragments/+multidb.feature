@@ -0,0 +1,3 @@
+The ``--database`` option of ``click-odoo`` accepts a list of databases or glob
+patterns, and the new ``--all-databases`` option runs a script on all databases,
+in parallel forked processes (``env_options(with_multi_database=True)``).
@@ -0,0 +1,2 @@
+The ``click-odoo`` interactive console starts immediately, while the registry
+is loaded in a background thread. ``env`` waits for it when it is first used.
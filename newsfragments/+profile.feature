@@ -0,0 +1,2 @@
+New ``--profile`` option, to profile scripts with cProfile, writing pstats and
+collapsed stacks for flame graphs (``env_options(with_profile=True)``).
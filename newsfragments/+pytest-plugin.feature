@@ -0,0 +1,3 @@
+Add a pytest plugin with ``odoo_db`` and ``odoo_env`` fixtures. Test databases
+are cloned from a template database built once per Odoo version and modules,
+and each test runs in a transaction that is rolled back.
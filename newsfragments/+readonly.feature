@@ -0,0 +1,2 @@
+Add ``--readonly``, to run scripts in a read only transaction, and
+``--replica``, to run them on a replica of the database.
@@ -0,0 +1,2 @@
+Add ``--retries`` to run scripts again, with a new environment, when they fail
+on a serialization failure or a deadlock, and ``run_with_retry``.
@@ -0,0 +1,2 @@
+New ``click_odoo.run_sharded`` function, to process records in parallel forked
+workers that share the loaded registry, committing chunk by chunk.
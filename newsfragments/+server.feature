@@ -0,0 +1,2 @@
+New ``click-odoo-server`` and ``click-odoo-client`` commands, to run scripts in
+pre-forked workers that keep the registries of the served databases loaded.
@@ -0,0 +1,2 @@
+Add ``--slow-queries`` and ``--slow-query-threshold`` options to log the slow
+queries with their Python stack and ``EXPLAIN (ANALYZE, BUFFERS)`` plan.
@@ -0,0 +1,2 @@
+Add ``--sql-stats`` and ``--sql-stats-file`` options to report the number,
+duration and most expensive SQL queries executed by the script.
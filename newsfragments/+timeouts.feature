@@ -0,0 +1,4 @@
+Add ``--statement-timeout``, ``--lock-timeout`` and
+``--idle-in-transaction-timeout``, to set PostgreSQL timeouts on the
+environment cursor, and ``--deadline``, to interrupt scripts that run for too
+long.
@@ -0,0 +1,2 @@
+New ``--timings`` and ``--timings-file`` options, reporting the wall clock and
+CPU time of the startup phases (``env_options(with_timings=True)``).
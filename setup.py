@@ -43,5 +43,11 @@ setup(
     entry_points="""
         [console_scripts]
         click-odoo=click_odoo.cli:main
+        click-odoo-server=click_odoo.server:serve
+        click-odoo-client=click_odoo.server:client
+        click-odoo-export=click_odoo.export:main
+        click-odoo-bulkload=click_odoo.bulkload:main
+        [pytest11]
+        click_odoo=click_odoo.pytest_plugin
     """,
 )
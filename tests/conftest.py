@@ -0,0 +1,26 @@
+# Copyright 2018 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+
+import os
+
+import pytest
+
+from click_odoo import odoo
+
+# This hack is necessary because the way CliRunner patches
+# stdout is not compatible with the Odoo logging initialization
+# mechanism. Logging is therefore tested with subprocesses.
+odoo.netsvc.init_logger = lambda: None
+
+
+if "CLICK_ODOO_TEST_DB" in os.environ:
+    # use an existing database instead of the one provided by
+    # the click-odoo pytest plugin, cloned from a template database
+    @pytest.fixture(scope="session")
+    def odoo_db():
+        return os.environ["CLICK_ODOO_TEST_DB"]
+
+
+@pytest.fixture(scope="session")
+def odoodb(odoo_db):
+    return odoo_db
@@ -0,0 +1,4 @@
+env = env  # noqa
+
+env.cr.execute("SELECT id FROM res_partner WHERE id = 1 FOR UPDATE")
+print("locked")
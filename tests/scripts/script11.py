@@ -0,0 +1,7 @@
+env = env  # noqa
+
+# count the runs in the database, to check each one is committed
+params = env["ir.config_parameter"]
+count = int(params.get_param("testparam") or 0) + 1
+params.set_param("testparam", str(count))
+print(count, id(env.registry))
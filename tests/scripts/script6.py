@@ -0,0 +1,9 @@
+import time
+
+env = env  # noqa
+
+env["ir.config_parameter"].set_param("testparam", "testvalue")
+data = []
+while True:
+    data.append(bytearray(1024 * 1024))
+    time.sleep(0.01)
@@ -0,0 +1,10 @@
+env = env  # noqa
+
+
+def handle(env, records):
+    params = env["ir.config_parameter"]
+    for record in records:
+        if record.get("fail"):
+            raise RuntimeError("testjsonl error")
+        params.set_param(record["key"], record["value"])
+        yield {"key": record["key"], "done": True}
@@ -0,0 +1,14 @@
+import os
+import sys
+
+env = env  # noqa
+
+# fail with a serialization failure, until the marker file exists
+marker = sys.argv[1]
+env["ir.config_parameter"].set_param("testparam", "testvalue")
+if not os.path.exists(marker):
+    open(marker, "w").close()
+    env.cr.execute(
+        "DO $$ BEGIN RAISE EXCEPTION 'testretry' "
+        "USING ERRCODE = 'serialization_failure'; END $$"
+    )
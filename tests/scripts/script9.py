@@ -0,0 +1,10 @@
+import sys
+import time
+
+env = env  # noqa
+
+if sys.argv[1] == "query":
+    env.cr.execute("SELECT pg_sleep(30)")
+else:
+    for _ in range(300):
+        time.sleep(0.1)
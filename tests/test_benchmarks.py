@@ -0,0 +1,167 @@
+# Copyright 2026 ACSONE SA/NV (<http://acsone.eu>)
+# License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
+"""Benchmarks of the click-odoo invocation overhead.
+
+They only run when the CLICK_ODOO_BENCHMARK environment variable is set:
+
+- CLICK_ODOO_BENCHMARK=1 compares the results with the baseline of the Odoo
+  series in tests/benchmarks/<series>.json, if it exists, failing when a
+  benchmark is slower than the baseline by more than
+  CLICK_ODOO_BENCHMARK_TOLERANCE (default: 0.5, ie 50%);
+- CLICK_ODOO_BENCHMARK=update writes the results as the new baseline.
+
+CLICK_ODOO_BENCHMARK_RESULTS is the path of a file where the results are
+written in json format. Timings depend on the machine, so baselines are
+only meaningful for the machine where they were recorded.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from click_odoo import OdooEnvironment, env_options, odoo
+from click_odoo.cli import main
+
+here = os.path.abspath(os.path.dirname(__file__))
+
+BENCHMARK = os.environ.get("CLICK_ODOO_BENCHMARK")
+TOLERANCE = float(os.environ.get("CLICK_ODOO_BENCHMARK_TOLERANCE", "0.5"))
+RESULTS = os.environ.get("CLICK_ODOO_BENCHMARK_RESULTS")
+
+# number of measures of each benchmark, the median is kept
+REPEAT = 5
+
+pytestmark = pytest.mark.skipif(not BENCHMARK, reason="CLICK_ODOO_BENCHMARK is not set")
+
+
+def _series():
+    return "{}.{}".format(*odoo.release.version_info[:2])
+
+
+def _baseline_path():
+    return os.path.join(here, "benchmarks", _series() + ".json")
+
+
+@pytest.fixture(scope="module")
+def benchmark_results():
+    results = {}
+    yield results
+    report = {
+        "odoo_version": _series(),
+        "python_version": platform.python_version(),
+        "benchmarks": results,
+    }
+    paths = [RESULTS] if RESULTS else []
+    if BENCHMARK == "update":
+        os.makedirs(os.path.dirname(_baseline_path()), exist_ok=True)
+        paths.append(_baseline_path())
+    for path in paths:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    if BENCHMARK == "update" or not os.path.exists(_baseline_path()):
+        return {}
+    with open(_baseline_path()) as f:
+        return json.load(f)["benchmarks"]
+
+
+@pytest.fixture
+def benchmark(benchmark_results, baseline):
+    def run(name, func, repeat=REPEAT):
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+        result = {
+            "median": statistics.median(durations),
+            "min": min(durations),
+            "runs": repeat,
+        }
+        benchmark_results[name] = result
+        if name in baseline:
+            limit = baseline[name]["median"] * (1 + TOLERANCE)
+            assert result["median"] <= limit, (
+                "{} is slower than the baseline: {:.3f}s > {:.3f}s + {:.0%}".format(
+                    name, result["median"], baseline[name]["median"], TOLERANCE
+                )
+            )
+        return result
+
+    return run
+
+
+def _click_odoo(odoodb, env=None):
+    script = os.path.join(here, "scripts", "script1.py")
+    cmd = [sys.executable, "-m", "click_odoo.cli", "-d", odoodb, script]
+    subprocess.check_call(cmd, stdout=subprocess.DEVNULL, env=env)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="needs PYTHONPYCACHEPREFIX")
+def test_startup_no_bytecode(odoodb, benchmark, tmpdir):
+    # each run compiles all modules, the bytecode cache being a new empty
+    # directory; the caches of the operating system are warm though
+    runs = iter(range(REPEAT))
+
+    def run():
+        env = dict(os.environ, PYTHONPYCACHEPREFIX=str(tmpdir / str(next(runs))))
+        _click_odoo(odoodb, env)
+
+    benchmark("startup_no_bytecode", run)
+
+
+def test_startup_warm(odoodb, benchmark):
+    _click_odoo(odoodb)
+    benchmark("startup_warm", lambda: _click_odoo(odoodb))
+
+
+def test_odoo_environment(odoodb, benchmark):
+    def enter_exit():
+        with OdooEnvironment(database=odoodb):
+            pass
+
+    benchmark("odoo_environment", enter_exit)
+
+
+def test_db_exists(odoodb, benchmark):
+    benchmark("db_exists", lambda: env_options()._db_exists(odoodb))
+
+
+def test_parse_config(odoodb, benchmark):
+    def parse_config():
+        if odoo.release.version_info >= (18, 0):
+            odoo.tools.config.parse_config(["-d", odoodb], setup_logging=True)
+        else:
+            odoo.tools.config.parse_config(["-d", odoodb])
+
+    benchmark("parse_config", parse_config)
+
+
+def test_script_runpy(odoodb, benchmark):
+    script = os.path.join(here, "scripts", "script1.py")
+
+    def run_script():
+        result = CliRunner().invoke(main, ["-d", odoodb, script])
+        assert result.exit_code == 0
+
+    benchmark("script_runpy", run_script)
+
+
+def test_script_stdin(odoodb, benchmark):
+    def run_stdin():
+        result = CliRunner().invoke(
+            main, ["-d", odoodb], input="print(env.user.login)\n"
+        )
+        assert result.exit_code == 0
+
+    benchmark("script_stdin", run_stdin)
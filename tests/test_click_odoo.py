@@ -2,10 +2,15 @@
 # License LGPL-3.0 or later (http://www.gnu.org/licenses/lgpl.html).
 
 
+import csv
+import io
+import json
 import os
+import pstats
 import subprocess
 import sys
 import textwrap
+import time
 
 import click
 import psycopg2
@@ -13,38 +18,11 @@ import pytest
 from click.testing import CliRunner
 
 import click_odoo
-from click_odoo import OdooEnvironment, console, odoo, odoo_bin
+from click_odoo import OdooEnvironment, console, odoo
 from click_odoo.cli import main
 
 here = os.path.abspath(os.path.dirname(__file__))
 
-# This hack is necessary because the way CliRunner patches
-# stdout is not compatible with the Odoo logging initialization
-# mechanism. Logging is therefore tested with subprocesses.
-odoo.netsvc.init_logger = lambda: None
-
-
-def _init_odoo_db(dbname):
-    subprocess.check_call(["createdb", dbname])
-    subprocess.check_call([odoo_bin, "-d", dbname, "-i", "base", "--stop-after-init"])
-
-
-def _drop_db(dbname):
-    subprocess.check_call(["dropdb", "--if-exists", dbname])
-
-
-@pytest.fixture(scope="session")
-def odoodb():
-    if "CLICK_ODOO_TEST_DB" in os.environ:
-        yield os.environ["CLICK_ODOO_TEST_DB"]
-    else:
-        dbname = "click-odoo-test-" + odoo.release.version.replace(".", "-")
-        try:
-            _init_odoo_db(dbname)
-            yield dbname
-        finally:
-            _drop_db(dbname)
-
 
 def test_odoo_env(odoodb):
     with OdooEnvironment(database=odoodb) as env:
@@ -119,6 +97,21 @@ def test_click_odoo_shebang_args(odoodb):
     )
 
 
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="requires PEP 562")
+def test_help_does_not_import_odoo():
+    code = textwrap.dedent(
+        """\
+        import sys
+        from click.testing import CliRunner
+        from click_odoo.cli import main
+        result = CliRunner().invoke(main, ["--help"])
+        assert result.exit_code == 0, result.output
+        assert "odoo" not in sys.modules
+        """
+    )
+    subprocess.check_call([sys.executable, "-c", code])
+
+
 def test_interactive_no_script(mocker, odoodb):
     mocker.patch.object(console.Shell, "ipython")
     mocker.patch.object(console.Shell, "python")
@@ -143,6 +136,135 @@ def test_interactive_no_script_preferred_shell(mocker, odoodb):
     assert console.Shell.python.call_count == 1
 
 
+def test_interactive_several_databases(mocker):
+    mocker.patch.object(console.Shell, "python")
+    mocker.patch.object(console, "_isatty", return_value=True)
+
+    runner = CliRunner()
+    result = runner.invoke(main, ["-d", "db1,db2", "--shell-interface=python"])
+    assert result.exit_code != 0
+    assert "cannot run on several databases" in result.output
+    assert console.Shell.python.call_count == 0
+
+
+def test_interactive_prewarm(mocker, odoodb):
+    envs = []
+
+    def python(local_vars):
+        env = local_vars["env"]
+        envs.append(env)
+        # waits for the registry loaded in the background
+        print(env.user.login)
+
+    mocker.patch.object(console.Shell, "python", side_effect=python)
+    mocker.patch.object(console, "_isatty", return_value=True)
+
+    runner = CliRunner()
+    result = runner.invoke(main, ["-d", odoodb, "--shell-interface=python"])
+    assert result.exit_code == 0, result.output
+    assert isinstance(envs[-1], click_odoo.LazyEnvironment)
+    assert "in the background" in result.output
+    assert "admin\n" in result.output
+
+    # --no-lazy-env loads the registry before starting the console
+    result = runner.invoke(
+        main, ["-d", odoodb, "--shell-interface=python", "--no-lazy-env"]
+    )
+    assert result.exit_code == 0, result.output
+    assert not isinstance(envs[-1], click_odoo.LazyEnvironment)
+    assert "in the background" not in result.output
+
+
+def test_completion(odoodb, tmpdir, monkeypatch):
+    from click_odoo import completion
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+    with OdooEnvironment(database=odoodb) as env:
+        completer = completion.Completer({"env": env})
+        prefix, names = completer.matches("env['res.partn")
+        assert prefix == "res.partn"
+        assert "res.partner" in names
+        assert all(name.startswith("res.partn") for name in names)
+        prefix, names = completer.matches("env.user.logi")
+        assert prefix == "logi"
+        assert "login" in names
+        prefix, names = completer.matches("env['res.partner'].sear")
+        assert "search(" in names
+        # not a record: left to the default completion
+        assert completer.matches("env.cr.exe") is None
+    # the index is cached for the next sessions
+    assert len(tmpdir.join("click-odoo").listdir()) == 1
+
+
+def test_completion_lazy_env():
+    from click_odoo import completion
+    from click_odoo.env import LazyEnvironment
+
+    def environment_manager(**kwargs):
+        raise AssertionError("the environment must not be loaded")
+
+    env = LazyEnvironment(environment_manager, database="db")
+    completer = completion.Completer({"env": env, "text": "abc"})
+    assert completer.matches("env['res.partn") is None
+    assert completer.matches("env['res.partner'].sear") == ("sear", [])
+    assert completer.matches("env.user.logi") == ("logi", [])
+    # other expressions are left to the default completion
+    assert completer.matches("text.upp") is None
+    assert not env.materialized
+
+
+def test_console_sql_monitor(odoodb):
+    with OdooEnvironment(database=odoodb) as env:
+        stream = io.StringIO()
+        monitor = console.SqlMonitor(env, stream=stream)
+        shell = console._InteractiveConsole({"env": env, "sqltrace": monitor}, monitor)
+        shell.push("env['res.partner'].search([]).mapped('name')")
+        assert monitor.last.count > 0
+        assert "SQL: {} queries in".format(monitor.last.count) in stream.getvalue()
+        assert "res_partner" not in stream.getvalue()
+        # sqltrace() prints the queries of the previous statement
+        shell.push("sqltrace()")
+        assert "res_partner" in stream.getvalue()
+        # sqltrace(True) prints them after each statement
+        shell.push("sqltrace(True)")
+        stream.truncate(0)
+        shell.push("env['res.users'].search([])")
+        assert "res_users" in stream.getvalue()
+        monitor.close()
+        assert "execute" not in vars(env.cr)
+
+
+def test_ptpython_sql_monitor():
+    import asyncio
+    import contextlib
+
+    statements = []
+
+    class Monitor:
+        @contextlib.contextmanager
+        def statement(self):
+            statements.append("start")
+            yield
+            statements.append("end")
+
+    class Repl:
+        def run_and_show_expression(self, expression):
+            statements.append(expression)
+
+        async def run_and_show_expression_async(self, expression):
+            statements.append(expression)
+
+    repl = Repl()
+    console._ptpython_sql_monitor(repl, Monitor())
+    repl.run_and_show_expression("sync")
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(repl.run_and_show_expression_async("async"))
+    finally:
+        loop.close()
+    assert statements == ["start", "sync", "end", "start", "async", "end"]
+
+
 def test_logging_stderr(capfd, odoodb):
     script = os.path.join(here, "scripts", "script3.py")
     cmd = ["click-odoo", "-d", odoodb, "--", script]
@@ -165,6 +287,30 @@ def test_logging_logfile(tmpdir, capfd, odoodb):
     assert "hello from script3" in logcontent
 
 
+def test_env_options_command_params(odoodb):
+    """Params of options that are not enabled belong to the command"""
+
+    @click.command()
+    @click_odoo.env_options()
+    @click.option("--jobs", type=int)
+    @click.option("--profile")
+    @click.option("--readonly", is_flag=True)
+    @click.option("--every", type=float)
+    def testcmd(env, jobs, profile, readonly, every):
+        env["ir.config_parameter"].set_param("testparam", "testvalue")
+        click.echo("{} {} {} {}".format(jobs, profile, readonly, every))
+
+    _cleanup_testparam(odoodb)
+    runner = CliRunner()
+    args = ["-d", odoodb, "--jobs", "2", "--profile", "p", "--readonly"]
+    result = runner.invoke(testcmd, args + ["--every", "60"])
+    assert result.exit_code == 0, result.output
+    assert "2 p True 60.0\n" in result.output
+    # not read only, and run once
+    _assert_testparam_present(odoodb, "testvalue")
+    _cleanup_testparam(odoodb)
+
+
 def test_env_options_withdb(odoodb, tmpdir):
     @click.command()
     @click_odoo.env_options()
@@ -309,6 +455,34 @@ def test_env_options_database_must_exist(odoodb):
     assert "with env" in result.output
 
 
+def test_lazy_env(odoodb):
+    @click.command()
+    @click_odoo.env_options(lazy_env=True)
+    @click.option("--write", is_flag=True)
+    def testcmd(env, write):
+        assert isinstance(env, click_odoo.LazyEnvironment)
+        if write:
+            env["ir.config_parameter"].set_param("testparam", "testvalue")
+        print("materialized" if env.materialized else "not materialized")
+
+    # the database is not used, so it is not loaded
+    result = CliRunner().invoke(testcmd, ["-d", "dbthatdoesnotexist"])
+    assert result.exit_code == 0, result.output
+    assert "not materialized" in result.output
+
+    # the environment is loaded on first use, and committed
+    _cleanup_testparam(odoodb)
+    result = CliRunner().invoke(testcmd, ["-d", odoodb, "--write"])
+    assert result.exit_code == 0, result.output
+    assert "\nmaterialized" in "\n" + result.output
+    _assert_testparam_present(odoodb, "testvalue")
+
+    _cleanup_testparam(odoodb)
+    result = CliRunner().invoke(testcmd, ["-d", odoodb, "--write", "--rollback"])
+    assert result.exit_code == 0, result.output
+    _assert_testparam_absent(odoodb)
+
+
 def _cleanup_testparam(dbname):
     with psycopg2.connect(dbname=dbname) as conn:
         with conn.cursor() as cr:
@@ -400,6 +574,157 @@ def test_write_raise(tmpdir, capfd, odoodb):
     _assert_testparam_absent(odoodb)
 
 
+def test_readonly(odoodb):
+    @click.command()
+    @click_odoo.env_options(with_readonly=True)
+    @click.option("--write", is_flag=True)
+    def testcmd(env, write):
+        env.cr.execute("SHOW transaction_read_only")
+        print("read only:", env.cr.fetchone()[0])
+        if write:
+            env["ir.config_parameter"].set_param("testparam", "testvalue")
+
+    _cleanup_testparam(odoodb)
+    result = CliRunner().invoke(testcmd, ["-d", odoodb, "--readonly"])
+    assert result.exit_code == 0, result.output
+    assert "read only: on" in result.output
+    # writing fails, even if the update is only in the cache of the ORM
+    result = CliRunner().invoke(testcmd, ["-d", odoodb, "--readonly", "--write"])
+    assert result.exit_code != 0
+    assert "read-only transaction" in result.output
+    _assert_testparam_absent(odoodb)
+    # the connections of the pool are not left in read only mode
+    result = CliRunner().invoke(testcmd, ["-d", odoodb])
+    assert "read only: off" in result.output
+
+
+def test_replica(odoodb):
+    @click.command()
+    @click_odoo.env_options(with_readonly=True)
+    def testcmd(env):
+        print("value:", env["ir.config_parameter"].get_param("testparam"))
+
+    replica = odoodb + "-replica"
+    _cleanup_testparam(odoodb)
+    odoo.sql_db.close_db(odoodb)
+    with psycopg2.connect(dbname="postgres") as conn:
+        conn.autocommit = True
+        with conn.cursor() as cr:
+            cr.execute('DROP DATABASE IF EXISTS "{}"'.format(replica))
+            cr.execute('CREATE DATABASE "{}" TEMPLATE "{}"'.format(replica, odoodb))
+    conn.close()
+    try:
+        # a value that is not in the replica
+        with OdooEnvironment(database=odoodb) as env:
+            env["ir.config_parameter"].set_param("testparam", "testvalue")
+        result = CliRunner().invoke(testcmd, ["-d", odoodb])
+        assert "value: testvalue" in result.output
+        result = CliRunner().invoke(testcmd, ["-d", odoodb, "--replica", replica])
+        assert result.exit_code == 0, result.output
+        assert "value: testvalue" not in result.output
+    finally:
+        _cleanup_testparam(odoodb)
+        odoo.sql_db.close_db(replica)
+        with psycopg2.connect(dbname="postgres") as conn:
+            conn.autocommit = True
+            with conn.cursor() as cr:
+                cr.execute('DROP DATABASE IF EXISTS "{}"'.format(replica))
+        conn.close()
+
+
+def test_timeouts(odoodb):
+    @click.command()
+    @click_odoo.env_options(with_timeouts=True)
+    @click.option("--sleep", type=float, default=0)
+    def testcmd(env, sleep):
+        env.cr.execute("SHOW statement_timeout")
+        print("statement_timeout:", env.cr.fetchone()[0])
+        env.cr.commit()
+        # the settings remain after commits
+        env.cr.execute("SHOW lock_timeout")
+        print("lock_timeout:", env.cr.fetchone()[0])
+        env.cr.execute("SELECT pg_sleep(%s)", (sleep,))
+
+    result = CliRunner().invoke(
+        testcmd, ["-d", odoodb, "--statement-timeout", "2", "--lock-timeout", "0.5"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "statement_timeout: 2s" in result.output
+    assert "lock_timeout: 500ms" in result.output
+    result = CliRunner().invoke(
+        testcmd, ["-d", odoodb, "--statement-timeout", "0.2", "--sleep", "5"]
+    )
+    assert result.exit_code != 0
+    assert "statement timeout" in result.output
+    # the connections of the pool are reset
+    result = CliRunner().invoke(testcmd, ["-d", odoodb])
+    assert "statement_timeout: 0" in result.output
+
+
+@pytest.mark.parametrize("wait", ["python", "query"])
+def test_deadline(odoodb, capfd, wait):
+    script = os.path.join(here, "scripts", "script9.py")
+    cmd = ["click-odoo", "-d", odoodb, "--deadline", "1", "--", script, wait]
+    start = time.time()
+    r = subprocess.call(cmd)
+    assert r != 0
+    assert time.time() - start < 20
+    _, err = capfd.readouterr()
+    assert "Deadline of 1.0s exceeded" in err
+
+
+def test_lock_watch(odoodb, capfd):
+    script = os.path.join(here, "scripts", "script10.py")
+    cmd = ["click-odoo", "-d", odoodb, "--lock-watch", "0.2", "--", script]
+    with OdooEnvironment(database=odoodb, rollback=True) as env:
+        env.cr.execute("SELECT id FROM res_partner WHERE id = 1 FOR UPDATE")
+        pid = env.cr._cnx.get_backend_pid()
+        proc = subprocess.Popen(cmd)
+        # polled from another connection, so the last query of the blocking
+        # session, that is logged, remains the one that took the lock
+        conn = psycopg2.connect(dbname=odoodb)
+        conn.autocommit = True
+        try:
+            # wait for the script to be blocked by this transaction
+            with conn.cursor() as cr:
+                for _ in range(600):
+                    cr.execute(
+                        "SELECT count(*) FROM pg_stat_activity "
+                        "WHERE %s = ANY(pg_blocking_pids(pid))",
+                        (pid,),
+                    )
+                    if cr.fetchone()[0]:
+                        break
+                    time.sleep(0.1)
+            time.sleep(1)
+        finally:
+            conn.close()
+            env.cr.rollback()
+        assert proc.wait() == 0
+    out, err = capfd.readouterr()
+    assert out == "locked\n"
+    # the query of the script, and the one of the blocking session
+    assert err.count("SELECT id FROM res_partner WHERE id = 1 FOR UPDATE") >= 2
+    assert "blocked by" in err
+    assert "pid {}".format(pid) in err
+    assert "lock waits: 1 waits" in err
+
+
+def test_deadline_stopped():
+    from click_odoo import timeouts
+
+    # the deadline passes while the block is being stopped
+    watchdog = timeouts.Deadline(0)
+    with watchdog._lock:
+        watchdog.start()
+        time.sleep(0.1)
+        watchdog._stopped = True
+    watchdog.stop()
+    # the main thread was not interrupted
+    time.sleep(0.1)
+    assert not watchdog.exceeded
+
+
 def test_env_cache(odoodb):
     """test a new environment does not reuse cache"""
     _cleanup_testparam(odoodb)
@@ -416,6 +741,706 @@ def test_env_cache(odoodb):
         assert not value
 
 
+def test_timings(odoodb, tmpdir, capfd):
+    script = os.path.join(here, "scripts", "script1.py")
+    timings_file = tmpdir / "timings.json"
+    cmd = ["click-odoo", "-d", odoodb, "--timings"]
+    cmd += ["--timings-file", str(timings_file), "--", script]
+    subprocess.check_call(cmd)
+    out, err = capfd.readouterr()
+    assert out == "admin\n"
+    timings = json.loads(timings_file.read())
+    phases = [p["phase"] for p in timings["phases"]]
+    for phase in ("import odoo", "parse_config", "registry", "command", "commit"):
+        assert phase in phases
+        assert phase in err
+    assert "base" in [m["module"] for m in timings["modules"]]
+
+
+def test_profile(odoodb, tmpdir, capfd):
+    script = os.path.join(here, "scripts", "script1.py")
+    profile = str(tmpdir / "script1.prof")
+    cmd = ["click-odoo", "-d", odoodb, "--profile", profile, "--", script]
+    subprocess.check_call(cmd)
+    out, err = capfd.readouterr()
+    assert out == "admin\n"
+    assert "cumulative" in err
+    stats = pstats.Stats(profile)
+    assert any(func[2] == "search" for func in stats.stats)
+    with open(profile + ".collapsed") as f:
+        stacks = f.read().splitlines()
+    assert stacks
+    assert any("search (" in stack for stack in stacks)
+    assert all(int(stack.rsplit(" ", 1)[1]) > 0 for stack in stacks)
+
+
+def test_profile_recursive_root(tmpdir):
+    import cProfile
+
+    from click_odoo import profiling
+
+    def fib(n):
+        return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+    profiler = cProfile.Profile()
+    profiler.runcall(fib, 20)
+    stats = pstats.Stats(profiler)
+    # fib is only called by itself and by the profiler
+    stats.stats = {
+        func: (cc, nc, tt, ct, {c: e for c, e in callers.items() if c == func})
+        for func, (cc, nc, tt, ct, callers) in stats.stats.items()
+        if func[2] == "fib"
+    }
+    path = str(tmpdir / "fib.collapsed")
+    profiling.write_collapsed(stats, path)
+    with open(path) as f:
+        stacks = f.read().splitlines()
+    assert stacks
+    assert all(stack.startswith("fib (") for stack in stacks)
+
+
+def test_sql_stats(odoodb, tmpdir, capfd):
+    script = os.path.join(here, "scripts", "script1.py")
+    stats_file = tmpdir / "sqlstats.json"
+    cmd = ["click-odoo", "-d", odoodb, "--sql-stats"]
+    cmd += ["--sql-stats-file", str(stats_file), "--", script]
+    subprocess.check_call(cmd)
+    out, err = capfd.readouterr()
+    assert out == "admin\n"
+    assert "SQL: " in err
+    stats = json.loads(stats_file.read())
+    assert stats["count"] > 0
+    assert stats["count"] == sum(s["count"] for s in stats["statements"])
+    assert any("res_users" in s["query"] for s in stats["statements"])
+
+
+def test_slow_queries(odoodb, tmpdir):
+    script = os.path.join(here, "scripts", "script1.py")
+    slow_queries = tmpdir / "slow.log"
+    cmd = ["click-odoo", "-d", odoodb, "--slow-queries", str(slow_queries)]
+    cmd += ["--slow-query-threshold", "0", "--", script]
+    subprocess.check_call(cmd)
+    log = slow_queries.read()
+    assert "script1.py" in log
+    assert "res_users" in log
+    assert "actual time=" in log  # EXPLAIN ANALYZE
+
+
+def test_sqlstats_analyze_safe():
+    from click_odoo.sqlstats import analyze_safe
+
+    assert analyze_safe("SELECT id FROM res_partner WHERE id IN %s")
+    assert analyze_safe("UPDATE res_partner SET active = false")
+    assert not analyze_safe("INSERT INTO res_partner (name) VALUES (%s)")
+    assert not analyze_safe("SELECT nextval('res_partner_id_seq')")
+    assert not analyze_safe("SELECT id FROM res_partner FOR NO KEY UPDATE")
+    assert not analyze_safe(
+        "WITH x AS (INSERT INTO res_partner (name) VALUES (%s) RETURNING id) "
+        "SELECT id FROM x"
+    )
+    assert not analyze_safe(
+        "WITH x AS (\n  DELETE FROM res_partner WHERE active RETURNING id\n)\n"
+        "SELECT count(*) FROM x"
+    )
+    assert not analyze_safe("WITH x AS (SELECT 1) UPDATE res_partner SET active = true")
+    assert analyze_safe("WITH x AS (SELECT id FROM res_partner) SELECT id FROM x")
+
+
+def test_sqlstats_normalize():
+    from click_odoo.sqlstats import normalize
+
+    assert (
+        normalize("SELECT id FROM t WHERE id IN (1, 2,3) AND name = 'a''b' AND x = %s")
+        == "SELECT id FROM t WHERE id IN (?) AND name = ? AND x = ?"
+    )
+    assert normalize(b"SELECT  %(a)s,\n  1.5") == "SELECT ?, ?"
+
+
+def test_soft_memory_limit(odoodb, capfd):
+    script = os.path.join(here, "scripts", "script1.py")
+    cmd = ["click-odoo", "-d", odoodb, "--soft-memory-limit", "100000", "--", script]
+    subprocess.check_call(cmd)
+    out, err = capfd.readouterr()
+    assert out == "admin\n"
+    assert "peak RSS: " in err
+
+
+def test_hard_memory_limit(odoodb, capfd):
+    _cleanup_testparam(odoodb)
+    script = os.path.join(here, "scripts", "script6.py")
+    cmd = ["click-odoo", "-d", odoodb, "--hard-memory-limit", "1000", "--", script]
+    r = subprocess.call(cmd)
+    assert r != 0
+    out, err = capfd.readouterr()
+    assert "exceeds the hard memory limit" in err
+    assert "script6.py" in err  # top allocations
+    _assert_testparam_absent(odoodb)
+
+
+def test_memory_trace_limit():
+    from click_odoo.memory import MB, MemoryGovernor
+
+    # allocations are only reported at the hard limit
+    assert not MemoryGovernor(soft_limit=100)._should_trace(10000 * MB)
+    governor = MemoryGovernor(soft_limit=100, hard_limit=1000)
+    assert not governor._should_trace(700 * MB)
+    assert governor._should_trace(900 * MB)
+
+
+def test_jsonl(odoodb):
+    script = os.path.join(here, "scripts", "script7.py")
+    lines = [
+        {"key": "testjsonl.1", "value": "a"},
+        {"key": "testjsonl.2", "value": "b"},
+        {"key": "testjsonl.3", "value": "c", "fail": True},
+        {"key": "testjsonl.4", "value": "d"},
+    ]
+    cmd = ["click-odoo", "-d", odoodb, "--jsonl", "--batch-size", "2", script]
+    proc = subprocess.run(
+        cmd,
+        input="".join(json.dumps(line) + "\n" for line in lines),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert proc.returncode != 0
+    results = [json.loads(line) for line in proc.stdout.splitlines()]
+    assert results == [
+        {"key": "testjsonl.1", "done": True},
+        {"key": "testjsonl.2", "done": True},
+    ]
+    assert "testjsonl error" in proc.stderr
+    assert "1 batches failed." in proc.stderr
+    with OdooEnvironment(database=odoodb) as env:
+        params = env["ir.config_parameter"]
+        assert params.get_param("testjsonl.1") == "a"
+        assert params.get_param("testjsonl.2") == "b"
+        # the failed batch is rolled back
+        assert not params.get_param("testjsonl.3")
+        assert not params.get_param("testjsonl.4")
+        params.search([("key", "=like", "testjsonl.%")]).unlink()
+
+
+def test_export_jsonl(odoodb, tmpdir):
+    from click_odoo.export import main as export_main
+
+    output = tmpdir / "users.jsonl"
+    result = CliRunner().invoke(
+        export_main,
+        [
+            "-d",
+            odoodb,
+            "-m",
+            "res.users",
+            "-f",
+            "id,login,partner_id",
+            "--domain",
+            "[('login', '=', 'admin')]",
+            "-o",
+            str(output),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    rows = [json.loads(line) for line in output.readlines()]
+    assert len(rows) == 1
+    assert rows[0]["login"] == "admin"
+    with OdooEnvironment(database=odoodb) as env:
+        admin = env["res.users"].browse(rows[0]["id"])
+        assert rows[0]["partner_id"] == [admin.partner_id.id, admin.partner_id.name]
+
+
+def test_export_csv(odoodb):
+    from click_odoo.export import export
+
+    with OdooEnvironment(database=odoodb) as env:
+        partners = env["res.partner"].search([], order="id")
+        output = io.StringIO()
+        count = export(
+            env,
+            "res.partner",
+            [],
+            ["name", "type", "company_id"],
+            output,
+            chunk_size=2,
+        )
+        assert count == len(partners)
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        assert rows[0] == ["name", "type", "company_id"]
+        assert rows[1][0] == partners[0].name
+        type_labels = dict(partners._fields["type"].get_description(env)["selection"])
+        assert rows[1][1] == type_labels[partners[0].type]
+        assert rows[1][2] == (partners[0].company_id.name or "")
+
+
+def test_export_always_false_domain(odoodb):
+    from click_odoo.export import export
+
+    with OdooEnvironment(database=odoodb) as env:
+        output = io.StringIO()
+        count = export(env, "res.partner", [("id", "in", [])], ["name"], output)
+        assert count == 0
+        assert output.getvalue().splitlines() == ["name"]
+
+
+@pytest.mark.parametrize("mode", ["orm", "sql"])
+def test_bulk_load(odoodb, mode):
+    from click_odoo.bulkload import bulk_load
+
+    domain = [("key", "=like", "testbulk.%")]
+    with OdooEnvironment(database=odoodb) as env:
+        params = env["ir.config_parameter"]
+        params.search(domain).unlink()
+        params.set_param("testbulk.0", "old")
+        data = io.StringIO(
+            "key,value\n"
+            "testbulk.0,new\n"
+            "testbulk.1,a\n"
+            ",c\n"  # rejected, key is required
+            "testbulk.1,a2\n"
+        )
+        result = bulk_load(
+            env, "ir.config_parameter", data, key="key", mode=mode, batch_size=2
+        )
+        assert result.created == 1
+        assert result.updated == 2
+        assert [row for row, _ in result.rejected] == [3]
+        assert params.get_param("testbulk.0") == "new"
+        assert params.get_param("testbulk.1") == "a2"
+        assert params.search_count(domain) == 2
+        params.search(domain).unlink()
+
+
+def test_bulk_load_permanent_table(odoodb):
+    from click_odoo.bulkload import STAGING_TABLE, bulk_load
+
+    with OdooEnvironment(database=odoodb, rollback=True) as env:
+        env.cr.execute("CREATE TABLE {} (id integer)".format(STAGING_TABLE))
+        data = io.StringIO("key,value\ntestbulk.0,a\n")
+        bulk_load(env, "ir.config_parameter", data, key="key")
+        env.cr.execute("SELECT to_regclass('public.{}')".format(STAGING_TABLE))
+        assert env.cr.fetchone()[0]
+
+
+def test_retries(odoodb, tmpdir, capfd):
+    _cleanup_testparam(odoodb)
+    script = os.path.join(here, "scripts", "script8.py")
+    marker = str(tmpdir.join("marker"))
+    cmd = ["click-odoo", "-d", odoodb, "--retries", "2", "--retry-delay", "0"]
+    subprocess.check_call(cmd + ["--", script, marker])
+    _, err = capfd.readouterr()
+    assert "Attempt 1 of 3 failed with a serialization failure (40001)" in err
+    _assert_testparam_present(odoodb, "testvalue")
+
+    # without retries, the command fails
+    _cleanup_testparam(odoodb)
+    os.remove(marker)
+    r = subprocess.call(["click-odoo", "-d", odoodb, "--", script, marker])
+    assert r != 0
+    _assert_testparam_absent(odoodb)
+
+
+def test_every(odoodb, capfd):
+    _cleanup_testparam(odoodb)
+    script = os.path.join(here, "scripts", "script11.py")
+    cmd = ["click-odoo", "-d", odoodb, "--every", "0.2", "--max-runs", "3"]
+    subprocess.check_call(cmd + ["--", script])
+    out, err = capfd.readouterr()
+    runs = [line.split() for line in out.splitlines()]
+    assert [count for count, _ in runs] == ["1", "2", "3"]
+    # the registry is not reloaded
+    assert len({registry for _, registry in runs}) == 1
+    assert "Run 3 done in" in err
+    _assert_testparam_present(odoodb, "3")
+    _cleanup_testparam(odoodb)
+
+
+def test_run_every():
+    from click_odoo import schedule
+
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) == 2:
+            # overruns the next run
+            time.sleep(0.3)
+        if len(calls) == 3:
+            raise ValueError()
+        return len(calls)
+
+    with pytest.raises(schedule.RunsFailed):
+        schedule.run_every(func, 0.2, max_runs=4)
+    assert len(calls) == 4
+    # runs start at fixed times from the first one
+    starts = [round((c - calls[0]) / 0.2) for c in calls]
+    assert starts == [0, 1, 3, 4]
+
+    calls[:] = []
+    assert schedule.run_every(func, 0.01, max_runs=1) == 1
+    assert len(calls) == 1
+
+
+def test_run_with_retry():
+    from click_odoo import retry
+
+    class SerializationFailure(Exception):
+        pgcode = "40001"
+
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) < 3:
+            try:
+                raise SerializationFailure()
+            except SerializationFailure as e:
+                # wrapped errors are retried too
+                raise RuntimeError("wrapped") from e
+        return "done"
+
+    assert retry.run_with_retry(func, retries=2, delay=0) == "done"
+    assert len(calls) == 3
+
+    calls[:] = []
+    with pytest.raises(RuntimeError):
+        retry.run_with_retry(func, retries=1, delay=0)
+    assert len(calls) == 2
+
+    def fail():
+        calls.append(1)
+        raise ValueError()
+
+    calls[:] = []
+    with pytest.raises(ValueError):
+        retry.run_with_retry(fail, retries=3, delay=0)
+    assert len(calls) == 1
+
+
+def test_multi_database(odoodb, tmpdir, capfd):
+    script = os.path.join(here, "scripts", "script1.py")
+    results_file = tmpdir / "results.jsonl"
+    databases = "{},{}?".format(odoodb, odoodb[:-1])
+    cmd = ["click-odoo", "-d", databases, "--results-file", str(results_file)]
+    subprocess.check_call(cmd + ["--", script])
+    out, err = capfd.readouterr()
+    assert out == "admin\n"
+    assert "{}: ok".format(odoodb) in err
+    results = [json.loads(line) for line in results_file.readlines()]
+    assert len(results) == 1
+    assert results[0]["database"] == odoodb
+    assert results[0]["status"] == "ok"
+
+
+def test_multi_database_files(odoodb, tmpdir, capfd):
+    script = os.path.join(here, "scripts", "script1.py")
+    databases = "{},{}?".format(odoodb, odoodb[:-1])
+    cmd = ["click-odoo", "-d", databases]
+    cmd += ["--profile", str(tmpdir / "{database}.prof")]
+    cmd += ["--timings-file", str(tmpdir / "{database}.json")]
+    subprocess.check_call(cmd + ["--", script])
+    capfd.readouterr()
+    assert (tmpdir / (odoodb + ".prof")).exists()
+    assert (tmpdir / (odoodb + ".prof.collapsed")).exists()
+    timings = json.loads((tmpdir / (odoodb + ".json")).read())
+    phases = [p["phase"] for p in timings["phases"]]
+    assert "parse_config" in phases
+    assert "command" in phases
+    assert not (tmpdir / "{database}.json").exists()
+
+
+def test_multi_database_failure(odoodb, tmpdir, capfd):
+    script = os.path.join(here, "scripts", "script4.py")
+    _cleanup_testparam(odoodb)
+    databases = "{},dbthatdoesnotexist".format(odoodb)
+    cmd = ["click-odoo", "-d", databases, "--jobs", "2", "--", script]
+    r = subprocess.call(cmd)
+    assert r != 0
+    out, err = capfd.readouterr()
+    assert "dbthatdoesnotexist: failed" in err
+    assert "1 of 2 databases failed" in err
+    # the successful database is committed
+    _assert_testparam_present(odoodb, "testvalue")
+
+
+@pytest.fixture
+def click_odoo_server(odoodb, tmpdir):
+    socket_path = str(tmpdir / "click-odoo.sock")
+    cmd = ["click-odoo-server", "-d", odoodb, "--socket", socket_path]
+    server = subprocess.Popen(cmd + ["--workers", "1", "--max-requests", "2"])
+    try:
+        deadline = time.time() + 120
+        while not os.path.exists(socket_path):
+            assert server.poll() is None
+            assert time.time() < deadline
+            time.sleep(0.1)
+        yield socket_path
+    finally:
+        server.terminate()
+        server.wait()
+    assert not os.path.exists(socket_path)
+
+
+def test_server(odoodb, click_odoo_server):
+    script = os.path.join(here, "scripts", "script2.py")
+    cmd = ["click-odoo-client", "--socket", click_odoo_server, "--", script, "a"]
+    result = subprocess.check_output(
+        cmd, universal_newlines=True, stdin=subprocess.DEVNULL
+    )
+    assert result == textwrap.dedent(
+        """\
+        sys.argv = {} a
+        __name__ = __main__
+        """.format(script)
+    )
+    # stdin is not read when a script is given, even if it is never closed
+    read_fd, write_fd = os.pipe()
+    try:
+        result = subprocess.check_output(
+            cmd, universal_newlines=True, stdin=read_fd, timeout=60
+        )
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+    assert result.startswith("sys.argv")
+
+
+def test_server_startup_crashes(monkeypatch):
+    from click_odoo import server
+
+    delays = []
+    monkeypatch.setattr(server.time, "sleep", delays.append)
+    srv = server.Server("unused.sock", ["db"])
+    srv._check_startup_crash(1, 0.1)
+    srv._check_startup_crash(1, 0.1)
+    assert delays == [1, 2]
+    # a worker that ran long enough resets the count
+    srv._check_startup_crash(1, server.MIN_WORKER_LIFETIME)
+    srv._check_startup_crash(0, 0.1)
+    assert delays == [1, 2]
+    for _ in range(server.MAX_STARTUP_CRASHES - 1):
+        srv._check_startup_crash(1, 0.1)
+    with pytest.raises(click.ClickException):
+        srv._check_startup_crash(1, 0.1)
+
+
+def test_server_transactions(odoodb, click_odoo_server):
+    script = os.path.join(here, "scripts", "script4.py")
+    cmd = ["click-odoo-client", "--socket", click_odoo_server, "-d", odoodb]
+    # enough runs to recycle the worker
+    _cleanup_testparam(odoodb)
+    subprocess.check_call(cmd + ["--rollback", script], stdin=subprocess.DEVNULL)
+    _assert_testparam_absent(odoodb)
+    r = subprocess.call(cmd + [script, "raise"], stdin=subprocess.DEVNULL)
+    assert r != 0
+    _assert_testparam_absent(odoodb)
+    with open(script) as f:
+        subprocess.check_call(cmd, stdin=f)
+    _assert_testparam_present(odoodb, "testvalue")
+    r = subprocess.call(cmd[:-1] + ["notadb", script], stdin=subprocess.DEVNULL)
+    assert r == 2
+
+
+def test_iter_pages(odoodb):
+    with OdooEnvironment(database=odoodb) as env:
+        params = env["ir.config_parameter"]
+        params.search([("key", "=like", "testpage.%")]).unlink()
+        for i in range(5):
+            params.set_param("testpage.{}".format(i), "todo")
+        domain = [("key", "=like", "testpage.%")]
+        ids = params.search(domain, order="id").ids
+        pages = []
+        for records in click_odoo.iter_pages(
+            env, "ir.config_parameter", domain, page_size=2, commit_every=2
+        ):
+            pages.append(records.ids)
+            records.write({"value": "done"})
+        assert pages == [ids[0:2], ids[2:4], ids[4:5]]
+        assert params.search(domain + [("value", "=", "done")]).ids == ids
+        records = click_odoo.iter_records(
+            env, "ir.config_parameter", domain, page_size=2, start_after=ids[2]
+        )
+        assert [r.id for r in records] == ids[3:]
+        params.search(domain).unlink()
+
+
+def test_compat_helpers_load_odoo():
+    # the helpers are used with environments that do not come from
+    # click-odoo, before anything else in click_odoo imported odoo
+    code = textwrap.dedent(
+        """
+        from click_odoo import compat
+
+        class Env:
+            def __getitem__(self, model):
+                return self
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: None
+
+        compat.flush_all(Env())
+        compat.invalidate_all(Env())
+        """
+    )
+    subprocess.check_call([sys.executable, "-c", code])
+
+
+@pytest.mark.parametrize("in_file", [False, True])
+def test_checkpoint(odoodb, tmpdir, in_file):
+    path = str(tmpdir / "checkpoint.json") if in_file else None
+    domain = [("key", "=like", "testcheckpoint.%")]
+    with OdooEnvironment(database=odoodb) as env:
+        params = env["ir.config_parameter"]
+        params.search(domain).unlink()
+        for i in range(5):
+            params.set_param("testcheckpoint.{}".format(i), "todo")
+        ids = params.search(domain, order="id").ids
+    # a first run that fails after 3 records
+    with pytest.raises(RuntimeError):
+        with OdooEnvironment(database=odoodb) as env:
+            checkpoint = click_odoo.Checkpoint(env, job="test", path=path)
+            assert checkpoint.watermark is None
+            for record in click_odoo.iter_records(
+                env, "ir.config_parameter", domain, page_size=2, checkpoint=checkpoint
+            ):
+                if record.id == ids[3]:
+                    raise RuntimeError()
+                record.value = "done"
+    # the second run resumes after the last committed page
+    with OdooEnvironment(database=odoodb) as env:
+        checkpoint = click_odoo.Checkpoint(env, job="test", path=path)
+        assert checkpoint.watermark == ids[1]
+        processed = []
+        for record in click_odoo.iter_records(
+            env, "ir.config_parameter", domain, page_size=2, checkpoint=checkpoint
+        ):
+            processed.append(record.id)
+            record.value = "done"
+        assert processed == ids[2:]
+        assert checkpoint.watermark is None
+        assert click_odoo.Checkpoint(env, job="test", path=path).watermark is None
+        params = env["ir.config_parameter"].search(domain)
+        assert set(params.mapped("value")) == {"done"}
+        params.unlink()
+
+
+def test_pytest_plugin_odoo_env(odoo_env):
+    params = odoo_env["ir.config_parameter"]
+    assert not params.get_param("testplugin")
+    params.set_param("testplugin", "committed")
+    odoo_env.cr.commit()
+    params.set_param("testplugin", "rolled back")
+    odoo_env.cr.rollback()
+    assert params.get_param("testplugin") == "committed"
+
+
+def test_pytest_plugin_rollback(odoo_db):
+    from click_odoo.pytest_plugin import _test_cursor
+
+    def test_env():
+        return OdooEnvironment(
+            database=odoo_db,
+            rollback=True,
+            keep_registry=True,
+            cursor_hooks=[_test_cursor],
+        )
+
+    with test_env() as env:
+        env["ir.config_parameter"].set_param("testplugin", "committed")
+        env.cr.commit()
+    # what a test committed is rolled back at its end
+    with test_env() as env:
+        assert not env["ir.config_parameter"].get_param("testplugin")
+
+
+def test_pytest_plugin_callbacks(odoo_env):
+    cr = odoo_env.cr
+    if not hasattr(cr, "precommit"):
+        pytest.skip("transaction callbacks require Odoo >= 14")
+    calls = []
+    cr.precommit.add(lambda: calls.append("precommit"))
+    cr.postcommit.add(lambda: calls.append("postcommit"))
+    cr.commit()
+    assert calls == ["precommit"]
+    # the callbacks of the transaction rolled back do not leak
+    cr.precommit.add(lambda: calls.append("precommit"))
+    cr.postcommit.add(lambda: calls.append("postcommit"))
+    cr.postrollback.add(lambda: calls.append("postrollback"))
+    cr.rollback()
+    cr.commit()
+    assert calls == ["precommit", "postrollback"]
+
+
+def test_run_sharded(odoodb):
+    with OdooEnvironment(database=odoodb) as env:
+        params = env["ir.config_parameter"]
+        params.search([("key", "=like", "testshard.%")]).unlink()
+        for i in range(10):
+            params.set_param("testshard.{}".format(i), "todo")
+
+    def callback(records):
+        for record in records:
+            if record.key == "testshard.7":
+                raise RuntimeError("testshard error")
+            record.value = "done"
+
+    progress = []
+    with OdooEnvironment(database=odoodb) as env:
+        domain = [("key", "=like", "testshard.%")]
+        results = click_odoo.run_sharded(
+            env,
+            "ir.config_parameter",
+            domain,
+            callback,
+            processes=2,
+            shard_size=4,
+            chunk_size=2,
+            progress=progress.append,
+        )
+        assert len(results) == 3
+        assert len(progress) == 3
+        failed = [r for r in results if r.error]
+        assert len(failed) == 1
+        assert "testshard error" in failed[0].error
+        assert sum(r.processed for r in results) < 10
+    # workers committed their chunks
+    with OdooEnvironment(database=odoodb) as env:
+        params = env["ir.config_parameter"].search(domain)
+        done = params.filtered(lambda p: p.value == "done")
+        assert len(done) == sum(r.processed for r in results)
+        assert params.filtered(lambda p: p.key == "testshard.7").value == "todo"
+        params.unlink()
+
+
+def test_run_sharded_connections(odoodb):
+    with OdooEnvironment(database=odoodb) as env:
+        params = env["ir.config_parameter"]
+        params.search([("key", "=like", "testshard.%")]).unlink()
+        for i in range(4):
+            params.set_param("testshard.{}".format(i), "todo")
+
+    def callback(records):
+        records.write({"value": str(records.env.cr._cnx.get_backend_pid())})
+
+    domain = [("key", "=like", "testshard.%")]
+    with OdooEnvironment(database=odoodb) as env:
+        click_odoo.run_sharded(
+            env, "ir.config_parameter", domain, callback, processes=2, shard_size=2
+        )
+        # connections of the parent, in use or idle in its pool
+        parent_pids = {
+            cnx.get_backend_pid()
+            for cnx, _ in odoo.sql_db._Pool._connections
+            if not cnx.closed
+        }
+        assert env.cr._cnx.get_backend_pid() in parent_pids
+    with OdooEnvironment(database=odoodb) as env:
+        params = env["ir.config_parameter"].search(domain)
+        worker_pids = {int(value) for value in params.mapped("value")}
+        assert worker_pids
+        assert not worker_pids & parent_pids
+        params.unlink()
+
+
 def test_env_options_addons_path():
     script = os.path.join(here, "scripts", "script5.py")
 